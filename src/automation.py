@@ -1,19 +1,75 @@
+from argparse import ArgumentParser
+
 from utils import MapboxStyle, TrainStatsData
 from utils.config import PlotConfig
 
 if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate the train-stats plots.")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="run from the cached data/*.csv sheet exports without downloading them",
+    )
+    parser.add_argument(
+        "--rebuild-snapshot",
+        action="store_true",
+        help="parse the sheets again instead of loading the parsed snapshot",
+    )
+    parser.add_argument(
+        "--verify-snapshot",
+        action="store_true",
+        help="check that the parsed snapshot matches a fresh parse of the sheets",
+    )
+    parser.add_argument(
+        "--geometry-cache-mb",
+        type=int,
+        default=256,
+        help="memory ceiling of the journey geometry cache shared by all plots",
+    )
+    parser.add_argument(
+        "--tile-cache-mb",
+        type=int,
+        default=512,
+        help="size limit of the basemap tile cache kept between runs",
+    )
+    parser.add_argument(
+        "--tile-ttl-days",
+        type=float,
+        default=30,
+        help="age after which cached basemap tiles are downloaded again",
+    )
+    args = parser.parse_args()
+
     # Setup Mapbox secrets
-    mapbox_style = MapboxStyle()
+    mapbox_style = MapboxStyle(ttl_days=args.tile_ttl_days, cache_mb=args.tile_cache_mb)
 
     # Setup data
-    data = TrainStatsData()
+    data = TrainStatsData(
+        offline=args.offline,
+        rebuild_snapshot=args.rebuild_snapshot,
+        geometry_cache_bytes=args.geometry_cache_mb * 1024 * 1024,
+    )
+    if args.verify_snapshot:
+        data.verify_snapshot()
 
     # Generate plots
     print("Generating plots...")
     config = data.get_plots_config()
+    plots = [PlotConfig(**plot) for _, plot in config.iterrows()]
+
+    # Download the basemap tiles of every map at once, before drawing any
+    mapbox_style.prefetch(
+        [plot.get_map_params() for plot in plots if plot.get_map_params()]
+    )
+
+    for plot in plots:
+        plot.run(data, mapbox_style)
 
-    for _, plot in config.iterrows():
-        PlotConfig(**plot).run(data, mapbox_style)
+    cache_stats = data.get_geometry_cache_stats()
+    print(
+        f"Geometry cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['evictions']} evictions"
+    )
 
     # Exit successfully
     print("All done!")
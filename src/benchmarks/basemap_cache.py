@@ -0,0 +1,38 @@
+"""Compare painting the basemap with the cartopy tile pipeline and from the cache.
+
+Uses the all-Europe map settings and the configured tile source. Run from the src
+directory: python -m benchmarks.basemap_cache
+"""
+
+import io
+from timeit import default_timer as timer
+
+import matplotlib.pyplot as plt
+
+from utils import MapboxStyle, MapParams
+from utils.plot_utils import SAVE_DPI, dark_figure
+
+
+def _render(mapbox_style: MapboxStyle, params: MapParams, cached: bool) -> float:
+    fig, ax = dark_figure(
+        projection=params.map_projection, figsize=params.get_fig_size()
+    )
+    ax[0].set_extent(params.get_extent())
+    start = timer()
+    if cached:
+        mapbox_style.add_basemap(ax[0], params)
+    else:
+        ax[0].add_image(mapbox_style, params.zoom_level, regrid_shape=3000)
+    fig.savefig(io.BytesIO(), format="png", dpi=SAVE_DPI)
+    plt.close(fig)
+    return timer() - start
+
+
+if __name__ == "__main__":
+    params = MapParams("All Europe", "all_europe", -10, 30, 35, 60, 5, "Robinson")
+    mapbox_style = MapboxStyle()
+    mapbox_style.prefetch([params])
+
+    print(f"Tile pipeline:  {_render(mapbox_style, params, False):.2f} s")
+    print(f"Cache miss:     {_render(mapbox_style, params, True):.2f} s")
+    print(f"Cache hit:      {_render(mapbox_style, params, True):.2f} s")
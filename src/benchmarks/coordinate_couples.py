@@ -0,0 +1,89 @@
+"""Compare the row-by-row and sliced coordinate couple builders on synthetic journeys.
+
+Run from the src directory: python -m benchmarks.coordinate_couples [number of journeys]
+"""
+
+import sys
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from utils import TrainStatsData
+
+
+class _SyntheticData(TrainStatsData):
+    def __init__(self, size: int):
+        rng = np.random.default_rng(0)
+        self._journeys = pd.DataFrame(
+            {"count": rng.integers(1, 100, size)},
+            index=pd.Index([f"Journey {i}" for i in range(size)], name="journey"),
+        )
+        # Random walks on a 1e-5 degree grid, with a few repeated points
+        self._coordinates = {}
+        for journey in self._journeys.index:
+            steps = rng.integers(-50, 51, (rng.integers(50, 500), 2))
+            walk = (rng.integers(0, 1_000_000, 2) + np.cumsum(steps, axis=0)) / 1e5
+            self._coordinates[journey] = np.vstack((walk, walk[-5:]))
+
+    def get_journeys(self, filter_start=None, filter_end=None) -> pd.DataFrame:
+        return self._journeys
+
+    def get_journey_coordinates(self, journey: str, feature: int = 0) -> np.ndarray:
+        return self._coordinates[journey]
+
+
+def _legacy_couples(data: TrainStatsData) -> pd.DataFrame:
+    journeys = data.get_journeys()
+    all_coordinate_couples = np.empty((0, 4))
+    journeys_list = []
+    journeys_counts = []
+
+    for journey in journeys.index.tolist():
+        coordinates = data.get_journey_coordinates(journey)
+        unique_coordinates_sorted, sort_indices = np.unique(
+            coordinates, axis=0, return_index=True
+        )
+        unique_coordinates = unique_coordinates_sorted[np.argsort(sort_indices)]
+        unique_coordinate_couples = np.empty((len(unique_coordinates) - 1, 4))
+        for i in range(len(unique_coordinate_couples)):
+            unique_coordinate_couples[i][0:2] = unique_coordinates[i]
+            unique_coordinate_couples[i][2:4] = unique_coordinates[i + 1][0:2]
+        if unique_coordinate_couples[0][0] > unique_coordinate_couples[-1][0]:
+            unique_coordinate_couples = unique_coordinate_couples[::-1]
+        all_coordinate_couples = np.append(
+            all_coordinate_couples, unique_coordinate_couples, axis=0
+        )
+        journeys_list += [journey] * len(unique_coordinate_couples)
+        journeys_counts += [journeys.loc[journey]["count"]] * len(
+            unique_coordinate_couples
+        )
+
+    return pd.DataFrame(
+        {
+            "lon1": all_coordinate_couples[:, 0],
+            "lat1": all_coordinate_couples[:, 1],
+            "lon2": all_coordinate_couples[:, 2],
+            "lat2": all_coordinate_couples[:, 3],
+            "journey": journeys_list,
+            "count": journeys_counts,
+        }
+    )
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    data = _SyntheticData(size)
+
+    start = timer()
+    legacy = _legacy_couples(data)
+    legacy_time = timer() - start
+
+    start = timer()
+    sliced = data.get_travel_coordinate_couples()
+    sliced_time = timer() - start
+
+    pd.testing.assert_frame_equal(legacy, sliced)
+    print(f"{size} journeys, {len(sliced)} coordinate couples")
+    print(f"Row-by-row loop: {legacy_time:8.3f} s")
+    print(f"Sliced pass:     {sliced_time:8.3f} s ({legacy_time / sliced_time:.1f}x)")
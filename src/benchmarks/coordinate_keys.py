@@ -0,0 +1,54 @@
+"""Compare pandas / np.unique(axis=0) coordinate grouping with packed int64 keys.
+
+Run from the src directory: python -m benchmarks.coordinate_keys [repetitions]
+"""
+
+import sys
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from utils import TrainStatsData
+from utils.coordinates import count_coordinates, unique_coordinates
+from utils.geometry import GeometryStore
+
+
+def _time(function, *args):
+    start = timer()
+    result = function(*args)
+    return result, timer() - start
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    # Every journey geometry, repeated as if each journey was travelled several times
+    store = GeometryStore.load_or_compile(
+        TrainStatsData._JOURNEYS_PATH, TrainStatsData._GEOMETRY_CACHE_PATH
+    )
+    coordinates = np.concatenate(
+        [store.get_coordinates(journey) for journey in store.get_journeys()]
+        * repetitions
+    )
+    print(f"{len(coordinates)} coordinates")
+
+    frame = pd.DataFrame({"lon": coordinates[:, 0], "lat": coordinates[:, 1]})
+    grouped, pandas_time = _time(
+        lambda: frame.groupby(["lon", "lat"]).size().reset_index(name="count")
+    )
+    (unique, counts), keys_time = _time(count_coordinates, coordinates)
+    assert (grouped[["lon", "lat"]].to_numpy() == unique).all()
+    assert (grouped["count"].to_numpy() == counts).all()
+    print(f"Counting, pandas groupby:   {pandas_time:8.3f} s")
+    print(
+        f"Counting, int64 keys:       {keys_time:8.3f} s ({pandas_time / keys_time:.1f}x)"
+    )
+
+    numpy_unique, numpy_time = _time(lambda: np.unique(coordinates, axis=0))
+    keys_unique, keys_time = _time(unique_coordinates, coordinates)
+    assert (numpy_unique == keys_unique).all()
+    print(f"Unique, np.unique(axis=0):  {numpy_time:8.3f} s")
+    print(
+        f"Unique, int64 keys:         {keys_time:8.3f} s ({numpy_time / keys_time:.1f}x)"
+    )
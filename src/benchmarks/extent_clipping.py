@@ -0,0 +1,57 @@
+"""Count the vertices drawn with and without clipping journeys to map extents.
+
+Run from the src directory: python -m benchmarks.extent_clipping
+"""
+
+from timeit import default_timer as timer
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from utils import MapParams, TrainStatsData
+from utils.geometry import GeometryStore
+from utils.plot_utils import dark_figure, get_clip_extent
+
+EXTENTS = {
+    "All Europe": (-10, 30, 35, 60, "Robinson"),
+    "Switzerland": (5.9, 10.5, 45.8, 47.8, "PlateCarree"),
+    "Milano": (8.9, 9.5, 45.3, 45.7, "PlateCarree"),
+}
+
+
+if __name__ == "__main__":
+    store = GeometryStore.load_or_compile(
+        TrainStatsData._JOURNEYS_PATH, TrainStatsData._GEOMETRY_CACHE_PATH
+    )
+    journeys = store.get_journeys()
+
+    for name, (lon_min, lon_max, lat_min, lat_max, projection) in EXTENTS.items():
+        params = MapParams(
+            name, name, lon_min, lon_max, lat_min, lat_max, 5, projection
+        )
+        fig, ax = dark_figure(
+            projection=params.map_projection, figsize=params.get_fig_size()
+        )
+        ax[0].set_extent(params.get_extent())
+        clip_extent = get_clip_extent(ax[0])
+        plt.close(fig)
+
+        # Builds the index on first use of a projection
+        store.get_projected_parts(journeys[0], params.map_projection, clip_extent)
+        start = timer()
+        parts = [
+            part
+            for journey in journeys
+            for part in store.get_projected_parts(
+                journey, params.map_projection, clip_extent
+            )
+        ]
+        clip_time = timer() - start
+        total = sum(end - start for start, end in map(store.get_range, journeys))
+        kept = sum(len(part) for part in parts)
+        print(
+            f"{name:12} {total:9} vertices, {kept:9} drawn"
+            f" ({total / max(kept, 1):7.1f}x less) in {len(parts):4} parts,"
+            f" clipped in {clip_time:.3f} s"
+        )
+        assert all(np.isfinite(part).all() for part in parts)
@@ -0,0 +1,86 @@
+"""Compare drawing heatmap points as scatter markers with the density raster.
+
+Run from the src directory: python -m benchmarks.heatmap_raster [repetitions]
+"""
+
+import io
+import sys
+from timeit import default_timer as timer
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from cartopy.crs import PlateCarree
+
+from utils import TrainStatsData
+from utils.coordinates import count_coordinates
+from utils.geometry import GeometryStore
+from utils.plot_utils import SAVE_DPI, dark_figure
+from utils.raster import DensityRaster
+
+
+def _render(draw) -> float:
+    start = timer()
+    fig, ax = dark_figure(projection=PlateCarree(), figsize=(7, 5.2))
+    ax[0].set_extent([-10, 30, 35, 60])
+    draw(fig, ax[0])
+    fig.savefig(io.BytesIO(), format="png", dpi=SAVE_DPI)
+    plt.close(fig)
+    return timer() - start
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    # Every journey geometry, jittered so that repetitions are distinct points
+    store = GeometryStore.load_or_compile(
+        TrainStatsData._JOURNEYS_PATH, TrainStatsData._GEOMETRY_CACHE_PATH
+    )
+    coordinates = np.concatenate(
+        [store.get_coordinates(journey) for journey in store.get_journeys()]
+        * repetitions
+    )
+    coordinates += np.random.default_rng(0).normal(0, 1e-3, coordinates.shape)
+    points, counts = count_coordinates(coordinates)
+    counts = counts.astype(float)
+    print(f"{len(points)} points")
+    color_map = matplotlib.colormaps["rainbow"]
+
+    def draw_scatter(_fig, ax):
+        order = np.argsort(counts, kind="stable")
+        ax.scatter(
+            points[order, 0],
+            points[order, 1],
+            s=1,
+            marker=".",
+            color=color_map((counts[order] - 1) / max(counts.max() - 1, 1)),
+            transform=PlateCarree(),
+        )
+
+    def draw_raster(fig, ax):
+        bbox = ax.get_window_extent()
+        shape = (
+            round(bbox.height * SAVE_DPI / fig.dpi),
+            round(bbox.width * SAVE_DPI / fig.dpi),
+        )
+        start = timer()
+        density = DensityRaster(list(ax.get_extent()), shape)
+        density.add_points(points[:, 0], points[:, 1], counts)
+        image = density.get_image(width=9)
+        print(f"Raster accumulation:  {timer() - start:8.3f} s")
+        ax.imshow(
+            image,
+            origin="lower",
+            extent=density.extent,
+            transform=ax.projection,
+            cmap=color_map,
+            norm=plt.Normalize(vmin=1, vmax=max(image.max(), 2)),
+            interpolation="nearest",
+        )
+
+    scatter_time = _render(draw_scatter)
+    raster_time = _render(draw_raster)
+    print(f"Scatter, draw + save: {scatter_time:8.3f} s")
+    print(
+        f"Raster, draw + save:  {raster_time:8.3f} s ({scatter_time / raster_time:.1f}x)"
+    )
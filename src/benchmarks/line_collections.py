@@ -0,0 +1,115 @@
+"""Compare drawing journeys with one plot call each, grouped LineCollections, and
+grouped LineCollections of coordinates projected ahead of time and clipped to the
+map.
+
+Uses the all-Europe map settings. Run from the src directory:
+python -m benchmarks.line_collections
+"""
+
+import io
+from timeit import default_timer as timer
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from cartopy.crs import PlateCarree
+
+from utils import MapParams, TrainStatsData
+from utils.geometry import GeometryStore
+from utils.plot_utils import SAVE_DPI, add_line_groups, dark_figure, get_clip_extent
+
+
+def _render(params: MapParams, draw) -> tuple[np.ndarray, float, float]:
+    fig, ax = dark_figure(
+        projection=params.map_projection, figsize=params.get_fig_size()
+    )
+    ax[0].set_extent(params.get_extent())
+    start = timer()
+    draw(ax[0])
+    draw_time = timer() - start
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=SAVE_DPI)
+    plt.close(fig)
+    buffer.seek(0)
+    return plt.imread(buffer), draw_time, timer() - start
+
+
+if __name__ == "__main__":
+    params = MapParams(
+        "All Europe", "all_europe", -10, 30, 35, 60, 5, "Robinson", is_portrait=False
+    )
+    store = GeometryStore.load_or_compile(
+        TrainStatsData._JOURNEYS_PATH, TrainStatsData._GEOMETRY_CACHE_PATH
+    )
+    journeys = store.get_journeys()
+    lines = [store.get_coordinates(journey) for journey in journeys]
+    print(f"{len(lines)} journeys")
+
+    # Synthetic counts, a tenth of the journeys being future ones
+    rng = np.random.default_rng(0)
+    counts = rng.integers(1, 50, len(lines))
+    linestyles = np.where(rng.random(len(lines)) < 0.1, ":", "-").tolist()
+    colors = matplotlib.colormaps["rainbow"]((counts - 1) / (counts.max() - 1))
+
+    def draw_plots(ax):
+        for line, color, linestyle, count in zip(lines, colors, linestyles, counts):
+            ax.plot(
+                line[:, 0],
+                line[:, 1],
+                linestyle,
+                linewidth=1.2,
+                color=color,
+                transform=PlateCarree(),
+                zorder=count,
+                solid_capstyle="round",
+            )
+
+    def draw_collections(ax):
+        add_line_groups(
+            ax,
+            lines,
+            colors,
+            linestyles,
+            counts,
+            linewidth=1.2,
+            transform=PlateCarree(),
+        )
+
+    def draw_projected(ax):
+        # Every part of a journey within the map, as the journeys map draws them
+        parts = [
+            store.get_projected_parts(journey, ax.projection, get_clip_extent(ax))
+            for journey in journeys
+        ]
+        line_journeys = np.repeat(np.arange(len(journeys)), [len(p) for p in parts])
+        add_line_groups(
+            ax,
+            [part for journey_parts in parts for part in journey_parts],
+            colors[line_journeys],
+            [linestyles[i] for i in line_journeys],
+            counts[line_journeys],
+            linewidth=1.2,
+            transform=ax.transData,
+        )
+
+    plots_image, plots_draw, plots_total = _render(params, draw_plots)
+    groups_image, groups_draw, groups_total = _render(params, draw_collections)
+    changed = np.abs(plots_image - groups_image).max(axis=-1) > 0.1
+    print(
+        f"Plot calls, draw:       {plots_draw:8.3f} s, with save {plots_total:8.3f} s"
+    )
+    print(
+        f"LineCollections, draw:  {groups_draw:8.3f} s, with save {groups_total:8.3f} s"
+        f" ({plots_total / groups_total:.1f}x)"
+    )
+    print(f"Pixels changed: {changed.mean():.4%}")
+
+    # Projects the whole store on first use, then loads it back from the cache
+    store.get_projected_parts(journeys[0], params.map_projection, params.get_extent())
+    projected_image, projected_draw, projected_total = _render(params, draw_projected)
+    changed = np.abs(plots_image - projected_image).max(axis=-1) > 0.1
+    print(
+        f"Projected, draw:        {projected_draw:8.3f} s, with save {projected_total:8.3f} s"
+        f" ({plots_total / projected_total:.1f}x)"
+    )
+    print(f"Pixels changed: {changed.mean():.4%}")
@@ -0,0 +1,96 @@
+"""Compare the per-row and per-time-zone trip localization on a synthetic sheet.
+
+Run from the src directory: python -m benchmarks.localize_trips [number of trips]
+"""
+
+import sys
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from pytz import timezone
+
+from utils import TrainStatsData
+from utils.stations import StationRegistry
+
+
+def _synthetic_trips(names: np.ndarray, size: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    departures = pd.Timestamp("2013-01-01 06:00") + pd.to_timedelta(
+        rng.integers(0, 10 * 365 * 24, size), unit="h"
+    )
+    # Stay clear of the nightly DST transitions, which raise in both implementations
+    departures = departures.where(
+        departures.hour >= 4, departures + pd.Timedelta(hours=4)
+    )
+    return pd.DataFrame(
+        {
+            "Origin": rng.choice(names, size),
+            "Destination": rng.choice(names, size),
+            "Departure (Local)": departures,
+        }
+    )
+
+
+def _legacy_time_zone(
+    stations: pd.DataFrame, custom_stations: pd.DataFrame, station: str
+) -> timezone:
+    # Custom stations first, then a scan of every standard station
+    custom_tz = custom_stations.loc[
+        custom_stations["name"] == station, "time_zone"
+    ].head(1)
+    if not custom_tz.empty:
+        return timezone(custom_tz.item())
+    return timezone(
+        stations.loc[stations["name"] == station, "time_zone"].head(1).item()
+    )
+
+
+def _legacy_localize(
+    stations: pd.DataFrame, custom_stations: pd.DataFrame, trips: pd.DataFrame
+) -> pd.Series:
+    trips["Departure"] = trips["Departure (Local)"].astype(object)
+    for index, row in trips.iterrows():
+        trips.loc[index, "Departure"] = trips.loc[index, "Departure"].tz_localize(
+            _legacy_time_zone(stations, custom_stations, row["Origin"])
+        )
+    return pd.to_datetime(trips["Departure"], utc=True)
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    # The registry of the plots, on the full standard stations
+    data = TrainStatsData.__new__(TrainStatsData)
+    data._station_registry = StationRegistry.from_csv(
+        data._STATIONS_PATH, data._CUSTOM_STATIONS_PATH, data._STATIONS_CACHE_PATH
+    )
+    stations = pd.read_csv(data._STATIONS_PATH, sep=";")
+    custom_stations = pd.read_csv(data._CUSTOM_STATIONS_PATH, sep=",")
+
+    # As many distinct stations as in a real sheet, about one in ten being custom
+    standard_names = (
+        stations.drop_duplicates(subset="name")
+        .dropna(subset=["name", "time_zone"])["name"]
+        .sample(200, random_state=0)
+    )
+    names = np.concatenate(
+        [standard_names.to_numpy(), custom_stations["name"].to_numpy()]
+    )
+    trips = _synthetic_trips(names, size)
+
+    start = timer()
+    legacy = _legacy_localize(stations, custom_stations, trips.copy())
+    legacy_time = timer() - start
+
+    start = timer()
+    grouped = data._localize_to_utc(trips["Departure (Local)"], trips["Origin"])
+    grouped_time = timer() - start
+
+    assert (legacy == grouped).all()
+    print(f"{size} trips, {len(stations)} standard stations")
+    print(f"Per-row loop:       {legacy_time:8.3f} s")
+    print(
+        f"Per-time-zone call: {grouped_time:8.3f} s ({legacy_time / grouped_time:.0f}x)"
+    )
@@ -0,0 +1,92 @@
+"""Compare drawing journeys in full and at the simplification level of the map.
+
+Uses the all-Europe map settings. Run from the src directory:
+python -m benchmarks.simplification
+"""
+
+import io
+import json
+from timeit import default_timer as timer
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from utils import MapParams, TrainStatsData
+from utils.geometry import GeometryStore
+from utils.plot_utils import (
+    SAVE_DPI,
+    add_line_groups,
+    dark_figure,
+    get_clip_extent,
+    get_simplification_level,
+)
+from utils.segments import SegmentGraph
+from utils.simplify import TOLERANCES, get_level, get_zoom_tolerance
+
+
+def _render(params: MapParams, store: GeometryStore, keep) -> tuple:
+    fig, ax = dark_figure(
+        projection=params.map_projection, figsize=params.get_fig_size()
+    )
+    ax[0].set_extent(params.get_extent())
+    start = timer()
+    clip_extent = get_clip_extent(ax[0])
+    lines = [
+        part
+        for journey in store.get_journeys()
+        for part in store.get_projected_parts(
+            journey, params.map_projection, clip_extent, keep=keep
+        )
+    ]
+    add_line_groups(
+        ax[0],
+        lines,
+        ["#ff7f00"] * len(lines),
+        ["-"] * len(lines),
+        [1] * len(lines),
+        linewidth=1.2,
+        transform=ax[0].transData,
+    )
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=SAVE_DPI)
+    plt.close(fig)
+    buffer.seek(0)
+    return plt.imread(buffer), sum(len(line) for line in lines), timer() - start
+
+
+if __name__ == "__main__":
+    params = MapParams("All Europe", "all_europe", -10, 30, 35, 60, 5, "Robinson")
+    store = GeometryStore.load_or_compile(
+        TrainStatsData._JOURNEYS_PATH, TrainStatsData._GEOMETRY_CACHE_PATH
+    )
+    graph = SegmentGraph.load_or_build(store, TrainStatsData._SEGMENT_GRAPH_PATH)
+    levels = graph.get_vertex_levels(store)
+
+    fig, ax = dark_figure(
+        projection=params.map_projection, figsize=params.get_fig_size()
+    )
+    ax[0].set_extent(params.get_extent())
+    level = get_simplification_level(fig, ax[0], params)
+    plt.close(fig)
+    print(f"Map level {level}, tolerance {TOLERANCES[level - 1]:.5f} degrees")
+
+    full_image, full_vertices, full_time = _render(params, store, None)
+    simple_image, simple_vertices, simple_time = _render(params, store, levels >= level)
+    changed = np.abs(full_image - simple_image).max(axis=-1) > 0.1
+    print(
+        f"Full:       {full_vertices:9} vertices, drawn and saved in {full_time:.3f} s"
+    )
+    print(
+        f"Simplified: {simple_vertices:9} vertices, drawn and saved in {simple_time:.3f} s"
+        f" ({full_vertices / simple_vertices:.1f}x fewer vertices)"
+    )
+    print(f"Pixels changed: {changed.mean():.4%}")
+
+    # Coordinates embedded in the interactive journeys map
+    zoom_level = get_level(get_zoom_tolerance(params.zoom_level + 3, 47.5))
+    for name, keep in [("full", None), (f"level {zoom_level}", levels >= zoom_level)]:
+        size = sum(
+            len(json.dumps(store.get_coordinates(journey, keep=keep).tolist()))
+            for journey in store.get_journeys()
+        )
+        print(f"Interactive map coordinates, {name}: {size / 1e6:.1f} MB")
@@ -5,42 +5,64 @@ from cartopy.crs import PlateCarree
 
 from utils import MapboxStyle, TrainStatsData, MapParams
 from utils.plot_utils import (
+    MAP_BOTTOM,
+    SAVE_DPI,
     dark_figure,
     finish_map,
+    get_simplification_level,
 )
+from utils.raster import DensityRaster
 
+# Width in saved pixels of the raster points and lines, close to the scatter markers
+RASTER_WIDTH = 9
 
-def plot_heatmap(data: TrainStatsData, mapbox_style: MapboxStyle, params: MapParams):
+
+def plot_heatmap(
+    data: TrainStatsData,
+    mapbox_style: MapboxStyle,
+    params: MapParams,
+    raster: bool = False,
+    raster_lines: bool = True,
+    aggregation: str = "max",
+    log_scale: bool = False,
+):
     # Setup figure
     fig, ax = dark_figure(
         grid=False, projection=params.map_projection, figsize=params.get_fig_size()
     )
     ax[0].set_extent(params.get_extent())
-    ax[0].add_image(mapbox_style, params.zoom_level, regrid_shape=3000)
+    mapbox_style.add_basemap(ax[0], params)
 
     # For all journeys in the dataset
     color_map = matplotlib.colormaps["rainbow"]
 
-    coordinates = data.get_travel_coordinates(filter_end=data.NOW)
-    coordinates_stats = (
-        coordinates.groupby(["lon", "lat"]).size().reset_index(name="count")
-    )
-    coordinates_stats.sort_values(["count"], ascending=True, inplace=True)
-
-    count_max = coordinates_stats["count"].max()
-    colors = color_map((coordinates_stats["count"].to_numpy() - 1) / (count_max - 1))
-
-    ax[0].scatter(
-        coordinates_stats["lon"].to_numpy(),
-        coordinates_stats["lat"].to_numpy(),
-        s=1,
-        marker=".",
-        color=colors,
-        transform=PlateCarree(),
-    )
+    if raster:
+        # Drawn once the layout is done, the color scale being set then
+        count_max = 1
+    else:
+        coordinates_stats = data.get_travel_coordinate_counts(filter_end=data.NOW)
+        coordinates_stats.sort_values(["count"], ascending=True, inplace=True)
+
+        count_max = coordinates_stats["count"].max()
+        colors = color_map(
+            (coordinates_stats["count"].to_numpy() - 1) / (count_max - 1)
+        )
+
+        ax[0].scatter(
+            coordinates_stats["lon"].to_numpy(),
+            coordinates_stats["lat"].to_numpy(),
+            s=1,
+            marker=".",
+            color=colors,
+            transform=PlateCarree(),
+        )
 
     # Setup colorbar
-    sm = cm.ScalarMappable(cmap=color_map, norm=plt.Normalize(vmin=0, vmax=count_max))
+    if log_scale:
+        norm = matplotlib.colors.LogNorm(vmin=1, vmax=count_max)
+    else:
+        norm = plt.Normalize(vmin=0, vmax=count_max)
+    sm = cm.ScalarMappable(cmap=color_map, norm=norm)
     sm.set_array([])
     cax = ax[0].inset_axes(params.get_colorbar_axes())
     cbar = fig.colorbar(sm, orientation="horizontal", cax=cax)
@@ -53,6 +75,12 @@ def plot_heatmap(data: TrainStatsData, mapbox_style: MapboxStyle, params: MapPar
         )
 
     plt.tight_layout()
+    if raster:
+        # On the pixel grid of the map as saved, finish_map leaving it unchanged
+        fig.subplots_adjust(bottom=MAP_BOTTOM)
+        norm.vmax = _draw_raster(
+            fig, ax[0], data, params, color_map, raster_lines, aggregation, log_scale
+        )
 
     # Stats
     distance_str, duration_str = data.get_stats(end=data.NOW)
@@ -81,3 +109,64 @@ def plot_heatmap(data: TrainStatsData, mapbox_style: MapboxStyle, params: MapPar
         colorbar=cbar,
         logo_position=params.get_logo_position(),
     )
+
+
+def _draw_raster(
+    fig, ax, data: TrainStatsData, params, color_map, lines, aggregation, log_scale
+) -> float:
+    """Draw travel counts as a single image on the map's pixel grid, returns its max."""
+    # One raster pixel per saved pixel, in the map projection's own coordinates,
+    # once the axes are shrunk to the aspect of the map
+    ax.apply_aspect()
+    bbox = ax.get_window_extent()
+    shape = (
+        round(bbox.height * SAVE_DPI / fig.dpi),
+        round(bbox.width * SAVE_DPI / fig.dpi),
+    )
+    density = DensityRaster(list(ax.get_extent()), shape, aggregation)
+
+    if lines:
+        # Lines can be simplified, unlike points which need to stay dense
+        segments = data.get_travel_segment_counts(
+            filter_end=data.NOW, level=get_simplification_level(fig, ax, params)
+        )
+        starts = ax.projection.transform_points(
+            PlateCarree(), segments["lon1"].to_numpy(), segments["lat1"].to_numpy()
+        )
+        ends = ax.projection.transform_points(
+            PlateCarree(), segments["lon2"].to_numpy(), segments["lat2"].to_numpy()
+        )
+        density.add_segments(
+            starts[:, 0],
+            starts[:, 1],
+            ends[:, 0],
+            ends[:, 1],
+            segments["count"].to_numpy(dtype=float),
+        )
+    else:
+        points = data.get_travel_coordinate_counts(filter_end=data.NOW)
+        projected = ax.projection.transform_points(
+            PlateCarree(), points["lon"].to_numpy(), points["lat"].to_numpy()
+        )
+        density.add_points(
+            projected[:, 0], projected[:, 1], points["count"].to_numpy(dtype=float)
+        )
+
+    image = density.get_image(width=RASTER_WIDTH)
+    count_max = image.max()
+    if log_scale:
+        norm = matplotlib.colors.LogNorm(vmin=1, vmax=count_max)
+    else:
+        # A count of 1 being the bottom color
+        norm = plt.Normalize(vmin=1, vmax=count_max)
+    ax.imshow(
+        image,
+        origin="lower",
+        extent=density.extent,
+        transform=ax.projection,
+        cmap=color_map,
+        norm=norm,
+        interpolation="nearest",
+        zorder=2,
+    )
+    return count_max
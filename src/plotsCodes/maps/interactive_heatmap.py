@@ -1,25 +1,37 @@
+import os
+
 import folium
+from folium.utilities import JsCode
 from utils import MapboxStyle, TrainStatsData, MapParams
+from utils.polyline import EncodedGeoJson, get_precision
+from utils.simplify import ZOOM_IN_LEVELS, get_zoom_tolerance
+from utils.static_site import StaticPage
+from utils.vector_tiles import VectorTileLoader, VectorTiler
 import matplotlib
+import numpy as np
+import pandas as pd
 from matplotlib.colors import rgb2hex
 from tqdm import tqdm
 
+LINE_STYLE = JsCode("""function (feature) {
+    return {color: feature.properties.color};
+}""")
+
 
 def plot_interactive_heatmap(
-    data: TrainStatsData, mapbox_style: MapboxStyle, params: MapParams
+    data: TrainStatsData,
+    mapbox_style: MapboxStyle,
+    params: MapParams,
+    encoded: bool = False,
+    sidecar: bool = False,
+    tiled: bool = False,
 ):
+    # Geometries in separate data files or tiles are always encoded
+    encoded = encoded or sidecar or tiled
+    page = StaticPage(params.file_name) if sidecar or tiled else None
+
     # Compute coords dataframe
-    coords = data.get_travel_coordinate_couples(filter_end=data.NOW)
-
-    coords_counts = (
-        coords.groupby(["lon1", "lat1", "lon2", "lat2"], sort=False)
-        .agg(
-            {
-                "count": "sum",  # Sum the counts for each group
-            }
-        )
-        .reset_index()
-    ).reset_index(drop=True)
+    coords_counts = data.get_travel_segment_counts(filter_end=data.NOW)
 
     max_count = coords_counts["count"].max()
     color_map = matplotlib.colormaps["rainbow"]
@@ -44,75 +56,99 @@ def plot_interactive_heatmap(
         overlay=False,
     ).add_to(m)
 
-    pbar = tqdm(total=coords_counts.shape[0])
-    row_index = coords_counts.index[0]
+    lines, run_counts = _get_runs(coords_counts)
 
-    number_of_polylines = 0
+    # Colors looked up by color map entry, as the color map itself picks them
+    hex_colors = [rgb2hex(color) for color in color_map(np.arange(color_map.N))]
+    colors = [{"color": color} for color in hex_colors]
 
-    # Initialize the coordinates list
-    coordinates = [
-        [coords_counts.loc[row_index]["lat1"], coords_counts.loc[row_index]["lon1"]],
-    ]
+    def get_color_indices(counts: np.ndarray) -> np.ndarray:
+        # Every segment traveled once, as with a single trip, has the first color
+        return np.minimum(
+            ((counts - 1) / max(max_count - 1, 1) * color_map.N).astype(int),
+            color_map.N - 1,
+        )
 
-    # For all sets of coordinates
-    while row_index <= coords_counts.index[-1]:
-        if row_index < coords_counts.index[-1] and _next_row_is_contiguous(
-            coords_counts, row_index
-        ):
-            # Next row is contiguous, add the coordinates to the list
-            coordinates.append(
-                [
-                    coords_counts.loc[row_index + 1]["lat1"],
-                    coords_counts.loc[row_index + 1]["lon1"],
-                ]
-            )
+    def get_features(level: int) -> list[tuple[dict, np.ndarray]]:
+        level_lines, level_counts = _get_runs(
+            data.get_travel_segment_counts(filter_end=data.NOW, level=level)
+        )
+        return [
+            (colors[color_index], line[:, ::-1])
+            for line, color_index in zip(level_lines, get_color_indices(level_counts))
+        ]
+
+    encoded_lines = None
+    if encoded:
+        # Polylines as the features of one layer, decoded once the page is loaded
+        layer = folium.GeoJson(
+            {"type": "FeatureCollection", "features": []},
+            name="Heatmap",
+            control=False,
+            style=LINE_STYLE,
+        ).add_to(m)
+        if tiled:
+            # Only the tiles in view are loaded
+            url = page.add_tiles("heatmap")
+            max_zoom = params.zoom_level + ZOOM_IN_LEVELS
+            VectorTiler(
+                os.path.join(page.path, url), params.zoom_level, max_zoom
+            ).write(get_features)
+            VectorTileLoader(layer, url, params.zoom_level, max_zoom).add_to(m)
         else:
-            # Next row is not contiguous or does not exist, complete the current coordinates list
-            coordinates.append(
-                [
-                    coords_counts.loc[row_index]["lat2"],
-                    coords_counts.loc[row_index]["lon2"],
-                ]
+            tolerance = get_zoom_tolerance(
+                params.zoom_level + ZOOM_IN_LEVELS, params.get_center_lat()
             )
-
-            # Create a PolyLine and add it to the map
-            count = coords_counts.loc[row_index]["count"]
+            encoded_lines = EncodedGeoJson(
+                layer,
+                [
+                    (colors[color_index], line[:, ::-1])
+                    for line, color_index in zip(lines, get_color_indices(run_counts))
+                ],
+                get_precision(tolerance),
+            ).add_to(m)
+            if page is not None:
+                encoded_lines.url = page.add_data("heatmap", encoded_lines.get_json())
+    else:
+        for line, color_index in zip(
+            tqdm(lines, desc="Drawing polylines...", ncols=150),
+            get_color_indices(run_counts),
+        ):
             folium.PolyLine(
-                locations=coordinates,
-                color=rgb2hex(color_map((count - 1) / (max_count - 1))),
+                locations=line.tolist(), color=hex_colors[color_index]
             ).add_to(m)
-            number_of_polylines += 1
-
-            if row_index < coords_counts.index[-1]:
-                # Reset the coordinates list and count
-                coordinates = [
-                    [
-                        coords_counts.loc[row_index + 1]["lat1"],
-                        coords_counts.loc[row_index + 1]["lon1"],
-                    ]
-                ]
 
-        row_index += 1
-        pbar.update(1)
-
-    pbar.close()
     folium.LayerControl().add_to(m)
 
-    print(f"Number of polylines: {number_of_polylines}")
+    print(f"Number of polylines: {len(lines)}")
 
     # Logging
     print("Finalizing plot...")
 
-    m.save(f"../plots/{params.file_name}.html")
+    if page is not None:
+        page.save(m)
+    else:
+        m.save(f"../plots/{params.file_name}.html")
+        if encoded_lines is not None:
+            encoded_lines.print_size(f"../plots/{params.file_name}.html")
 
 
-def _next_row_is_contiguous(df, row_index):
-    count_remains_same = df.loc[row_index + 1]["count"] == df.loc[row_index]["count"]
-    longitudes_are_contiguous = (
-        df.loc[row_index + 1]["lon1"] == df.loc[row_index]["lon2"]
+def _get_runs(coords_counts: pd.DataFrame) -> tuple[list[np.ndarray], np.ndarray]:
+    # Runs of contiguous segments with the same count, as lat/lon lines and counts
+    lon1, lat1, lon2, lat2, counts = (
+        coords_counts[column].to_numpy()
+        for column in ["lon1", "lat1", "lon2", "lat2", "count"]
     )
-    latitudes_are_contiguous = (
-        df.loc[row_index + 1]["lat1"] == df.loc[row_index]["lat2"]
+    contiguous = (
+        (counts[1:] == counts[:-1]) & (lon1[1:] == lon2[:-1]) & (lat1[1:] == lat2[:-1])
     )
-    coordinates_are_contiguous = longitudes_are_contiguous and latitudes_are_contiguous
-    return count_remains_same and coordinates_are_contiguous
+    run_starts = np.flatnonzero(np.append(len(counts) > 0, ~contiguous))
+    run_ends = np.append(run_starts[1:], len(counts))
+
+    starts = np.column_stack((lat1, lon1))
+    ends = np.column_stack((lat2, lon2))
+    lines = [
+        np.concatenate((starts[start:end], ends[end - 1 : end]))
+        for start, end in zip(run_starts, run_ends)
+    ]
+    return lines, counts[run_starts]
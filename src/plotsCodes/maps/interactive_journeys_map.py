@@ -1,14 +1,39 @@
+import os
+
 import folium
+from folium.utilities import JsCode
 from tqdm import tqdm
 from utils import MapboxStyle, TrainStatsData, MapParams
-import geopandas
+from utils.polyline import EncodedGeoJson, get_precision
+from utils.simplify import ZOOM_IN_LEVELS, get_level, get_zoom_tolerance
+from utils.static_site import StaticPage
+from utils.vector_tiles import VectorTileLoader, VectorTiler
 import matplotlib
+import numpy as np
+import pandas as pd
 from matplotlib.colors import rgb2hex
 
+# Styles read from the feature properties in the browser, one function per layer
+JOURNEY_STYLE = JsCode("""function (feature) {
+    return {color: feature.properties.color, dashArray: feature.properties.dashArray};
+}""")
+STATION_STYLE = JsCode("""function (feature) {
+    return {color: feature.properties.color, fillColor: feature.properties.color};
+}""")
+
 
 def plot_interactive_journeys_map(
-    data: TrainStatsData, mapbox_style: MapboxStyle, params: MapParams
+    data: TrainStatsData,
+    mapbox_style: MapboxStyle,
+    params: MapParams,
+    encoded: bool = False,
+    sidecar: bool = False,
+    tiled: bool = False,
 ):
+    # Geometries in separate data files or tiles are always encoded
+    encoded = encoded or sidecar or tiled
+    page = StaticPage(params.file_name) if sidecar or tiled else None
+
     # Compute journeys dataframe
     journeys = data.get_journeys()
     journeys.sort_values("count", ascending=True, inplace=True)
@@ -33,82 +58,152 @@ def plot_interactive_journeys_map(
         overlay=False,
     ).add_to(m)
 
+    # Journeys below stations, however late they are loaded
+    folium.map.CustomPane("journeys", z_index=390, pointer_events=True).add_to(m)
+
     # For all journeys in the dataset
     max_count = journeys["count"].max()
     color_map = matplotlib.colormaps["rainbow"]
 
+    tolerance = get_zoom_tolerance(
+        params.zoom_level + ZOOM_IN_LEVELS, params.get_center_lat()
+    )
+    level = get_level(tolerance)
+
+    # All journeys in a single layer, more travelled ones last to be drawn on top
+    journey_properties = {}
     for journey in tqdm(
         journeys.index.to_list(),
         ncols=150,
         desc=f"{params.title} (Journeys)",
     ):
-        count = journeys.loc[journey, "count"]
-
-        geojson = data.get_geojson(journey)
-
+        count = int(journeys.loc[journey, "count"])
         distance = journeys.loc[journey, "distance"]
 
-        tmp = geopandas.GeoDataFrame.from_features(geojson, crs="epsg:4326")
-        tmp["name"] = f"<b>{journey}</b>"
-        tmp["count"] = count
+        properties = {
+            "name": f"<b>{journey}</b>",
+            "count": count,
+            "color": rgb2hex(color_map((count - 1) / (max_count - 1))),
+        }
         if journeys.loc[journey, "firstdate"] < data.NOW:
-            tmp["label"] = (
+            properties["label"] = (
                 f"<center>Traveled {count} time{'s' if count > 1 else ''} ({round(distance)} km)</center>"
             )
-            tmp["dashArray"] = "0, 0"
+            properties["dashArray"] = "0, 0"
         else:
-            tmp["label"] = "Travel planned in the future"
-            tmp["dashArray"] = "2, 10"
-
-        popup = folium.GeoJsonPopup(
-            fields=["name", "label"],
-            labels=False,
+            properties["label"] = "Travel planned in the future"
+            properties["dashArray"] = "2, 10"
+        journey_properties[journey] = properties
+
+    def get_features(feature_level: int) -> list[tuple[dict, np.ndarray]]:
+        return [
+            (properties, np.array(feature["geometry"]["coordinates"]))
+            for journey, properties in journey_properties.items()
+            for feature in data.get_geojson(journey, feature_level)["features"]
+        ]
+
+    # Encoded geometries are decoded into the layer once the page is loaded
+    features = (
+        []
+        if encoded
+        else [
+            {
+                "type": "Feature",
+                "properties": properties,
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": coordinates.tolist(),
+                },
+            }
+            for properties, coordinates in get_features(level)
+        ]
+    )
+    journeys_layer = folium.GeoJson(
+        {
+            "type": "FeatureCollection",
+            "features": features or [_get_fields_feature(["name", "label"])],
+        },
+        name="Journeys",
+        control=False,
+        popup=folium.GeoJsonPopup(fields=["name", "label"], labels=False),
+        style=JOURNEY_STYLE,
+        pane="journeys",
+    ).add_to(m)
+    encoded_journeys = None
+    if tiled:
+        # Only the tiles in view are loaded
+        url = page.add_tiles("journeys")
+        max_zoom = params.zoom_level + ZOOM_IN_LEVELS
+        VectorTiler(os.path.join(page.path, url), params.zoom_level, max_zoom).write(
+            get_features
         )
-
-        folium.GeoJson(
-            tmp,
-            name=journey,
-            control=False,
-            popup=popup,
-            style_function=lambda x: {
-                "color": rgb2hex(
-                    color_map((x["properties"]["count"] - 1) / (max_count - 1))
-                ),
-                "dashArray": x["properties"]["dashArray"],
-            },
+        VectorTileLoader(journeys_layer, url, params.zoom_level, max_zoom).add_to(m)
+    elif encoded:
+        encoded_journeys = EncodedGeoJson(
+            journeys_layer, get_features(level), get_precision(tolerance)
         ).add_to(m)
+        if page is not None:
+            encoded_journeys.url = page.add_data(
+                "journeys", encoded_journeys.get_json()
+            )
 
     # Get all stations
     stations = data.get_past_stations()
 
-    # For all stations in the dataset
-    for station in tqdm(
-        stations.index.to_list(),
-        ncols=150,
-        desc=f"{params.title} (Stations)",
-    ):
-        # Get the data
-        row = stations.loc[station]
-
-        # Add a dot (CircleMarker) to the map
-        tooltip = folium.Tooltip(
-            f"<b>{station}</b> (visited {int(row['Visit_Count'])} time{'s' if row['Visit_Count'] > 1 else ''})",
-        )
-
-        folium.CircleMarker(
-            name=row.index,
-            tooltip=tooltip,
-            location=[row["latitude"], row["longitude"]],
-            radius=4,
-            color=rgb2hex(color_map((row["Visit_Count"] - 1) / (max_count - 1))),
-            fill=True,
-            fill_color=rgb2hex(color_map((row["Visit_Count"] - 1) / (max_count - 1))),
-            fill_opacity=1.0,
-        ).add_to(m)
+    # All stations in a single layer of dots (CircleMarker)
+    features = get_station_features(stations, max_count)
+
+    stations_layer = folium.GeoJson(
+        {
+            "type": "FeatureCollection",
+            "features": features or [_get_fields_feature(["label"])],
+        },
+        name="Stations",
+        control=False,
+        tooltip=folium.GeoJsonTooltip(fields=["label"], labels=False),
+        marker=folium.CircleMarker(radius=4, fill=True, fill_opacity=1.0),
+        style=STATION_STYLE,
+    ).add_to(m)
+    if page is not None:
+        page.link_data(stations_layer, "stations")
 
     folium.LayerControl().add_to(m)
 
     # Logging
     print("Finalizing plot...")
 
-    m.save(f"../plots/{params.file_name}.html")
+    if page is not None:
+        page.save(m)
+    else:
+        m.save(f"../plots/{params.file_name}.html")
+        if encoded_journeys is not None:
+            encoded_journeys.print_size(f"../plots/{params.file_name}.html")
+
+
+def get_station_features(stations: pd.DataFrame, max_count: int) -> list[dict]:
+    """Point features of the stations, colored by visit count like the journeys."""
+    color_map = matplotlib.colormaps["rainbow"]
+    features = []
+    for station, row in stations.iterrows():
+        visit_count = int(row["Visit_Count"])
+        features.append(
+            {
+                "type": "Feature",
+                "properties": {
+                    "label": f"<b>{station}</b> (visited {visit_count} time{'s' if visit_count > 1 else ''})",
+                    "count": visit_count,
+                    "color": rgb2hex(color_map((visit_count - 1) / (max_count - 1))),
+                },
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [row["longitude"], row["latitude"]],
+                },
+            }
+        )
+    return features
+
+
+def _get_fields_feature(fields: list[str]) -> dict:
+    # Feature without geometry, skipped by Leaflet, giving the popup or tooltip of a
+    # layer without features yet the fields folium checks them against
+    return {"type": "Feature", "properties": dict.fromkeys(fields), "geometry": None}
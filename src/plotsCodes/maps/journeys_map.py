@@ -1,13 +1,15 @@
 import matplotlib
 import matplotlib.cm as cm
 import matplotlib.pyplot as plt
-from cartopy.crs import PlateCarree
 from tqdm import tqdm
 
 from utils import MapboxStyle, TrainStatsData, MapParams
 from utils.plot_utils import (
+    add_line_groups,
     dark_figure,
     finish_map,
+    get_clip_extent,
+    get_simplification_level,
 )
 
 
@@ -22,37 +24,42 @@ def plot_journeys_map(
         grid=False, projection=params.map_projection, figsize=params.get_fig_size()
     )
     ax[0].set_extent(params.get_extent())
-    ax[0].add_image(mapbox_style, params.zoom_level, regrid_shape=3000)
+    mapbox_style.add_basemap(ax[0], params)
 
     # For all journeys in the dataset
     values = journeys["count"].values
     color_map = matplotlib.colormaps["rainbow"]
 
-    journeys_list = journeys.index.to_list()
-    for journey in tqdm(
-        journeys_list,
-        ncols=150,
-        desc=f"{params.title} (Portrait)" if params.is_portrait else params.title,
+    # Future journeys are dotted, more travelled ones are drawn on top
+    colors = color_map((values - 1) / (values.max() - 1))
+    linestyles = ["-" if date < data.NOW else ":" for date in journeys["firstdate"]]
+
+    # Only the parts of the journeys around the map extent
+    clip_extent = get_clip_extent(ax[0])
+    level = get_simplification_level(fig, ax[0], params)
+    lines, line_journeys = [], []
+    for ii, journey in enumerate(
+        tqdm(
+            journeys.index.to_list(),
+            ncols=150,
+            desc=f"{params.title} (Portrait)" if params.is_portrait else params.title,
+        )
     ):
-        if journeys.loc[journey, "firstdate"] < data.NOW:
-            s = "-"
-        else:
-            s = ":"
-
-        count = journeys.loc[journey, "count"]
-        c = color_map((count - 1) / (values.max() - 1))
-
-        coordinates = data.get_journey_coordinates(journey)
-        ax[0].plot(
-            coordinates[:, 0],
-            coordinates[:, 1],
-            s,
-            linewidth=1.2,
-            color=c,
-            transform=PlateCarree(),
-            zorder=count,
-            solid_capstyle="round",
+        parts = data.get_journey_projected_parts(
+            journey, params.map_projection, clip_extent, level
         )
+        lines.extend(parts)
+        line_journeys.extend([ii] * len(parts))
+
+    add_line_groups(
+        ax[0],
+        lines,
+        colors[line_journeys],
+        [linestyles[ii] for ii in line_journeys],
+        values[line_journeys],
+        linewidth=1.2,
+        transform=ax[0].transData,
+    )
 
     # Logging
     print("Finalizing plot...")
@@ -2,13 +2,15 @@ import matplotlib
 import matplotlib.cm as cm
 import matplotlib.pyplot as plt
 import numpy as np
-from cartopy.crs import PlateCarree
 from matplotlib.colors import LinearSegmentedColormap, BoundaryNorm
 
 from utils import MapboxStyle, TrainStatsData, TripParams, MapParams
 from utils.plot_utils import (
+    add_line_groups,
     dark_figure,
     finish_map,
+    get_clip_extent,
+    get_simplification_level,
     get_trip_labels,
 )
 
@@ -24,7 +26,7 @@ def plot_trip_map(
         grid=False, projection=params.map_projection, figsize=params.get_fig_size()
     )
     ax[0].set_extent(params.get_extent())
-    ax[0].add_image(mapbox_style, params.zoom_level, regrid_shape=3000)
+    mapbox_style.add_basemap(ax[0], params)
 
     # Setup colormap
     color_map = matplotlib.colormaps["rainbow"]
@@ -40,7 +42,10 @@ def plot_trip_map(
 
     sm = cm.ScalarMappable(cmap=custom_map, norm=norm)
 
-    # For all journeys in the dataset
+    # For all journeys in the dataset, only around the map extent
+    clip_extent = get_clip_extent(ax[0])
+    level = get_simplification_level(fig, ax[0], params)
+    lines, colors, linestyles, zorders = [], [], [], []
     trip_list = trips.index.to_list()
     for trip_item in trip_list:
         # Get the departure datetime
@@ -51,29 +56,30 @@ def plot_trip_map(
         trip_ratio = (trip_day - 1) / (
             trip.get_trip_duration_days() - 1
         )  # value must be between 0 and 1
-        c = sm.to_rgba(trip_day - 1)
+        parts = data.get_journey_projected_parts(
+            trips.loc[trip_item, "journey"], params.map_projection, clip_extent, level
+        )
+        lines.extend(parts)
+        colors.extend([sm.to_rgba(trip_day - 1)] * len(parts))
 
         # Dashes or not
         if trips.loc[trip_item, "Arrival"] < data.NOW:
-            s = "-"
-            dashes = [1, 0]
+            linestyles.extend(["-"] * len(parts))
         else:
-            s = ":"
-            dashes = [1, 1 + trip_ratio]
-
-        # Plot the trip
-        coordinates = data.get_journey_coordinates(trips.loc[trip_item, "journey"])
-        ax[0].plot(
-            coordinates[:, 0],
-            coordinates[:, 1],
-            s,
-            linewidth=params.get_line_width(),
-            color=c,
-            transform=PlateCarree(),
-            zorder=(trip.get_trip_duration_days() - trip_day) + 2,
-            solid_capstyle="round",
-            dashes=dashes,
-        )
+            linestyles.extend([(0, (1, 1 + trip_ratio))] * len(parts))
+
+        zorders.extend([(trip.get_trip_duration_days() - trip_day) + 2] * len(parts))
+
+    # Plot the trips, one collection per line style and day
+    add_line_groups(
+        ax[0],
+        lines,
+        colors,
+        linestyles,
+        zorders,
+        linewidth=params.get_line_width(),
+        transform=ax[0].transData,
+    )
 
     # Logging
     print("Finalizing plot...")
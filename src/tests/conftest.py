@@ -0,0 +1,8 @@
+import os
+import sys
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules are imported and data paths resolved from src, as when plotting
+sys.path.insert(0, SRC_PATH)
+os.chdir(SRC_PATH)
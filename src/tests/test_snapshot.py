@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from utils import TrainStatsData
+
+
+@pytest.mark.skipif(
+    not os.path.exists(TrainStatsData._TRIPS_PATH),
+    reason="requires the cached sheet exports",
+)
+def test_snapshot_matches_fresh_parse():
+    # The first load saves a snapshot if there is none, the second one reads it
+    TrainStatsData(offline=True)
+    data = TrainStatsData(offline=True)
+    data.verify_snapshot()
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import folium
+import pytest
+
+from utils.static_site import StaticPage, compress_site, write_compressed
+
+SRC_PATH = os.path.join(os.path.dirname(__file__), "..")
+
+# Name of the stations data file of the journeys map, from the cached sheets
+STATIONS_DATA_SCRIPT = """
+import sys
+import folium
+from plotsCodes.maps.interactive_journeys_map import get_station_features
+from utils import TrainStatsData
+from utils.static_site import StaticPage
+
+data = TrainStatsData(offline=True)
+max_count = data.get_journeys()["count"].max()
+layer = folium.GeoJson(
+    {
+        "type": "FeatureCollection",
+        "features": get_station_features(data.get_past_stations(), max_count),
+    }
+)
+StaticPage("stations", path=sys.argv[1]).link_data(layer, "stations")
+print(layer.embed_link)
+"""
+
+
+def get_stations_data_url(path: str, hash_seed: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", STATIONS_DATA_SCRIPT, path],
+        cwd=SRC_PATH,
+        env={**os.environ, "PYTHONHASHSEED": hash_seed},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+@pytest.mark.skipif(
+    not os.path.exists(os.path.join(SRC_PATH, "../data/trips.csv")),
+    reason="requires the cached sheet exports",
+)
+def test_stations_data_url_is_stable(tmp_path):
+    # Station sets iterate in a different order with every hash seed
+    urls = [get_stations_data_url(str(tmp_path), seed) for seed in ["1", "2"]]
+    assert urls[0].startswith("data/stations.")
+    assert urls[0] == urls[1]
+
+
+def save_page(path: str, file_name: str, tiles: list[str]):
+    page = StaticPage(file_name, path=path)
+    for name in tiles:
+        write_compressed(
+            os.path.join(path, page.add_tiles(name), "5/16/11.json"), b"{}"
+        )
+    page.save(folium.Map(tiles=None))
+
+
+def test_prune_removes_unused_tiles(tmp_path):
+    path = str(tmp_path)
+    save_page(path, "journeys", ["journeys"])
+    save_page(path, "heatmap", ["heatmap"])
+    assert sorted(os.listdir(os.path.join(path, "tiles"))) == ["heatmap", "journeys"]
+
+    save_page(path, "journeys", [])
+    assert os.listdir(os.path.join(path, "tiles")) == ["heatmap"]
+
+
+def test_compress_site_writes_same_siblings(tmp_path):
+    path = str(tmp_path)
+    save_page(path, "journeys", ["journeys"])
+    tile_path = os.path.join(path, "tiles/journeys/5/16/11.json")
+    compressed = {}
+    for file_path in [os.path.join(path, "journeys.html"), tile_path]:
+        with open(file_path + ".gz", "rb") as f:
+            compressed[file_path] = f.read()
+        os.remove(file_path + ".gz")
+
+    compress_site(path)
+    for file_path, data in compressed.items():
+        with open(file_path + ".gz", "rb") as f:
+            assert f.read() == data
@@ -0,0 +1,47 @@
+import os
+import time
+
+from utils.tiles import DirectoryTileSource, TileCache
+
+
+def set_times(cache: TileCache, name: str, accessed: float, modified: float):
+    os.utime(os.path.join(cache.path, name), (accessed, modified))
+
+
+def test_directory_source_fetch(tmp_path):
+    os.makedirs(os.path.join(tmp_path, "5", "16"))
+    with open(os.path.join(tmp_path, "5", "16", "11.png"), "wb") as f:
+        f.write(b"tile")
+
+    source = DirectoryTileSource(str(tmp_path))
+    assert source.fetch((16, 11, 5)) == b"tile"
+    assert source.get_key() == DirectoryTileSource(str(tmp_path)).get_key()
+
+
+def test_read_after_ttl(tmp_path):
+    cache = TileCache(str(tmp_path), ttl_seconds=60, max_bytes=1000)
+    cache.put((16, 11, 5), b"tile")
+    assert cache.get((16, 11, 5)) == b"tile"
+    assert cache.get((16, 12, 5)) is None
+
+    now = time.time()
+    set_times(cache, os.path.join("5", "16", "11.png"), now, now - 120)
+    assert cache.get((16, 11, 5)) is None
+
+
+def test_evict_expired_then_least_recently_used(tmp_path):
+    cache = TileCache(str(tmp_path), ttl_seconds=60, max_bytes=20)
+    now = time.time()
+    # One expired file, then fresh ones from the least to the most recently used
+    for name, accessed, modified in [
+        ("expired", now, now - 120),
+        ("oldest", now - 30, now),
+        ("older", now - 20, now),
+        ("newest", now - 10, now),
+    ]:
+        cache.write(name, b"x" * 10)
+        set_times(cache, name, accessed, modified)
+
+    assert cache.evict() == 2
+    assert sorted(os.listdir(tmp_path)) == ["newest", "older"]
+    assert cache.evict() == 0
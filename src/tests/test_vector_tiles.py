@@ -0,0 +1,29 @@
+import json
+import os
+
+import numpy as np
+
+from utils.vector_tiles import VectorTiler
+
+
+def get_features(level: int) -> list[tuple[dict, np.ndarray]]:
+    return [({"color": "#ff0000"}, np.array([[2.35, 48.85], [4.83, 45.76]]))]
+
+
+def test_write_without_features(tmp_path):
+    path = os.path.join(tmp_path, "tiles", "empty")
+    VectorTiler(path, 5, 8).write(lambda level: [])
+    with open(os.path.join(path, VectorTiler.INDEX)) as f:
+        assert json.load(f) == {}
+
+
+def test_write_removes_tiles_without_features(tmp_path):
+    path = os.path.join(tmp_path, "tiles", "lines")
+    VectorTiler(path, 5, 6).write(get_features)
+    with open(os.path.join(path, VectorTiler.INDEX)) as f:
+        names = list(json.load(f))
+    assert names
+    assert all(os.path.exists(os.path.join(path, name)) for name in names)
+
+    VectorTiler(path, 5, 6).write(lambda level: [])
+    assert not any(os.path.exists(os.path.join(path, name)) for name in names)
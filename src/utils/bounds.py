@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class BoundingBoxIndex:
+    """Bounding boxes of packed LineStrings, and of chunks of their vertices.
+
+    Lines are the [start, end) ranges of a (N, 2) coordinates array. Each chunk box
+    also covers the first vertex of the next chunk of its line, so that a segment
+    is always within the box of the chunk it starts in.
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, coordinates: np.ndarray, lines: list[tuple[int, int]]):
+        self._coordinates = coordinates
+        lines = [(start, end) for start, end in lines if end > start]
+
+        # Chunks tile every line, lines being contiguous and in order, so that
+        # reducing from a chunk start up to the next one reduces exactly the chunk
+        self._chunk_starts = np.concatenate(
+            [np.arange(start, end, self.CHUNK_SIZE) for start, end in lines]
+        )
+        line_ends = np.concatenate(
+            [
+                np.full(len(range(start, end, self.CHUNK_SIZE)), end)
+                for start, end in lines
+            ]
+        )
+        minimum = np.minimum.reduceat(coordinates, self._chunk_starts, axis=0)
+        maximum = np.maximum.reduceat(coordinates, self._chunk_starts, axis=0)
+
+        # Widen chunks to the first vertex of the next chunk of the same line
+        next_starts = self._chunk_starts + self.CHUNK_SIZE
+        overlapping = next_starts < line_ends
+        minimum[overlapping] = np.minimum(
+            minimum[overlapping], coordinates[next_starts[overlapping]]
+        )
+        maximum[overlapping] = np.maximum(
+            maximum[overlapping], coordinates[next_starts[overlapping]]
+        )
+        # x_min, x_max, y_min, y_max of every chunk
+        self._chunk_boxes = np.column_stack(
+            (minimum[:, 0], maximum[:, 0], minimum[:, 1], maximum[:, 1])
+        )
+
+    def clip(self, start: int, end: int, extent: list[float]) -> list[tuple[int, int]]:
+        """Parts of the line with segments whose bounding box meets the extent.
+
+        Returns [start, end) ranges of the coordinates: none if the line is entirely
+        outside the extent, and the whole line if it is entirely inside.
+        """
+        x_min, x_max, y_min, y_max = extent
+        if end <= start:
+            return []
+        chunks = self._get_chunks(start, end)
+        boxes = self._chunk_boxes[chunks]
+        meets = (
+            (boxes[:, 0] <= x_max)
+            & (boxes[:, 1] >= x_min)
+            & (boxes[:, 2] <= y_max)
+            & (boxes[:, 3] >= y_min)
+        )
+        if not meets.any():
+            return []
+        if (
+            (boxes[:, 0] >= x_min).all()
+            and (boxes[:, 1] <= x_max).all()
+            and (boxes[:, 2] >= y_min).all()
+            and (boxes[:, 3] <= y_max).all()
+        ):
+            return [(start, end)]
+
+        # Segments starting in a chunk that meets the extent, tested one by one
+        segments = np.concatenate(
+            [
+                np.arange(first, min(first + self.CHUNK_SIZE, end - 1))
+                for first in self._chunk_starts[chunks[meets]]
+            ]
+        )
+        a = self._coordinates[segments]
+        b = self._coordinates[segments + 1]
+        segments = segments[
+            (np.minimum(a[:, 0], b[:, 0]) <= x_max)
+            & (np.maximum(a[:, 0], b[:, 0]) >= x_min)
+            & (np.minimum(a[:, 1], b[:, 1]) <= y_max)
+            & (np.maximum(a[:, 1], b[:, 1]) >= y_min)
+        ]
+        if len(segments) == 0:
+            return []
+
+        # Runs of consecutive segments, each drawn as its own line
+        breaks = np.flatnonzero(np.diff(segments) > 1) + 1
+        firsts = segments[np.append(0, breaks)]
+        lasts = segments[np.append(breaks - 1, len(segments) - 1)]
+        return [(first, last + 2) for first, last in zip(firsts, lasts)]
+
+    def _get_chunks(self, start: int, end: int) -> np.ndarray:
+        return np.arange(
+            np.searchsorted(self._chunk_starts, start),
+            np.searchsorted(self._chunk_starts, end),
+        )
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import numpy as np
+
+
+class ArrayLRUCache:
+    """Least recently used cache of read-only arrays, bounded by their total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._size: int = 0
+        self._entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        array = self._entries.get(key)
+        if array is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return array
+
+        self.misses += 1
+        array = compute()
+        array.setflags(write=False)
+        if array.nbytes <= self.max_bytes:
+            self._entries[key] = array
+            self._size += array.nbytes
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+                self.evictions += 1
+        return array
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pytz import timezone
 
@@ -77,6 +78,18 @@ class PlotConfig:
         else:
             self._map_params = None
 
+        # Optional raster heatmap columns, blank cells keeping the default rendering
+        raster_lines = kwargs.get("Raster lines")
+        self._raster_options = {
+            "raster_lines": True if raster_lines is None else bool(raster_lines),
+            "aggregation": kwargs.get("Aggregation") or "max",
+            "log_scale": bool(kwargs.get("Log scale")),
+        }
+
+    def get_map_params(self) -> Optional[MapParams]:
+        # Map parameters of the plot if it is drawn on a map and not skipped
+        return None if self._skip else self._map_params
+
     def run(self, data: TrainStatsData, mapbox_style: MapboxStyle):
         if self._skip:
             print(f"Skipping [{self._plot_type}] {self._plot_params.file_name}")
@@ -104,14 +117,46 @@ class PlotConfig:
                 return plot_timed_number_per_operator(data, self._plot_params)
             case "Heatmap":
                 return plot_heatmap(data, mapbox_style, self._map_params)
+            case "Raster heatmap":
+                return plot_heatmap(
+                    data,
+                    mapbox_style,
+                    self._map_params,
+                    raster=True,
+                    **self._raster_options,
+                )
             case "Journeys map":
                 return plot_journeys_map(data, mapbox_style, self._map_params)
             case "Interactive Journeys Map":
                 return plot_interactive_journeys_map(
                     data, mapbox_style, self._map_params
                 )
+            case "Encoded Interactive Journeys Map":
+                return plot_interactive_journeys_map(
+                    data, mapbox_style, self._map_params, encoded=True
+                )
+            case "Static Interactive Journeys Map":
+                return plot_interactive_journeys_map(
+                    data, mapbox_style, self._map_params, sidecar=True
+                )
+            case "Tiled Interactive Journeys Map":
+                return plot_interactive_journeys_map(
+                    data, mapbox_style, self._map_params, tiled=True
+                )
             case "Interactive Heatmap":
                 return plot_interactive_heatmap(data, mapbox_style, self._map_params)
+            case "Encoded Interactive Heatmap":
+                return plot_interactive_heatmap(
+                    data, mapbox_style, self._map_params, encoded=True
+                )
+            case "Static Interactive Heatmap":
+                return plot_interactive_heatmap(
+                    data, mapbox_style, self._map_params, sidecar=True
+                )
+            case "Tiled Interactive Heatmap":
+                return plot_interactive_heatmap(
+                    data, mapbox_style, self._map_params, tiled=True
+                )
             case "Distance timeline":
                 return plot_distance_timeline(data, self._plot_params)
             case "Duration timeline":
@@ -0,0 +1,45 @@
+from typing import Optional
+
+import numpy as np
+
+SCALE = 100_000
+# Quantized degrees stay well within +/- 2^30, so both halves fit in 31 bits
+_OFFSET = 1 << 30
+
+
+def quantized_keys(quantized: np.ndarray) -> np.ndarray:
+    """Pack (n, 2) integer lon/lat pairs into int64 keys sorting like the pairs."""
+    quantized = quantized.astype(np.int64)
+    return ((quantized[:, 0] + _OFFSET) << 31) | (quantized[:, 1] + _OFFSET)
+
+
+def coordinate_keys(coordinates: np.ndarray) -> np.ndarray:
+    """Pack (n, 2) lon/lat degrees into int64 keys, at a 1e-5 degree resolution."""
+    return quantized_keys(np.rint(coordinates * SCALE))
+
+
+def unique_coordinates(
+    coordinates: np.ndarray, return_index: bool = False, return_inverse: bool = False
+):
+    """Same results as np.unique(coordinates, axis=0) for coordinates on the grid."""
+    _, index, inverse = np.unique(
+        coordinate_keys(coordinates), return_index=True, return_inverse=True
+    )
+    unique = coordinates[index]
+    if return_index and return_inverse:
+        return unique, index, inverse
+    if return_index:
+        return unique, index
+    if return_inverse:
+        return unique, inverse
+    return unique
+
+
+def count_coordinates(
+    coordinates: np.ndarray, weights: Optional[np.ndarray] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct coordinates in lon/lat order, with their number of (weighted) rows."""
+    unique, inverse = unique_coordinates(coordinates, return_inverse=True)
+    if weights is None:
+        return unique, np.bincount(inverse)
+    return unique, np.bincount(inverse, weights=weights).astype(weights.dtype)
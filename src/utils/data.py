@@ -1,13 +1,22 @@
+import inspect
 import json
 import os
 from datetime import datetime, timedelta
+from typing import Optional
 
 import numpy as np
 import pandas as pd
+from cartopy.crs import Projection
 from dotenv import load_dotenv
 from pytz import timezone
-from requests import get
-from tqdm import tqdm
+
+from .cache import ArrayLRUCache
+from .coordinates import coordinate_keys, unique_coordinates
+from .geometry import GeometryStore
+from .hashing import combine_hashes, file_sha256
+from .segments import SegmentGraph, TravelCounts
+from .sheets import SheetExport, SheetsClient
+from .stations import StationRegistry
 
 load_dotenv()
 
@@ -23,23 +32,64 @@ class TrainStatsData:
     _CUSTOM_STATIONS_PATH = "../data/custom_stations.csv"
     _JOURNEYS_PATH = "../data/journeys_coords/"
     _PLOTS_CONFIG_PATH = "../data/plots_config.csv"
-
-    def __init__(self):
-        self._stations: pd.DataFrame = pd.read_csv(
-            self._STATIONS_PATH, sep=";", low_memory=False
-        )
-        self._custom_stations: pd.DataFrame = pd.read_csv(
-            self._CUSTOM_STATIONS_PATH, sep=","
+    _STATIONS_CACHE_PATH = "../data/cache/stations/"
+    _SHEETS_CACHE_PATH = "../data/cache/sheets.json"
+    _SNAPSHOT_PATH = "../data/cache/snapshot/"
+    _GEOMETRY_CACHE_PATH = "../data/cache/geometry/"
+    _SEGMENT_GRAPH_PATH = "../data/cache/geometry/graph.npz"
+    _TRAVEL_COUNTS_PATH = "../data/cache/geometry/travel_counts/"
+    _SNAPSHOT_FRAMES = ["trips", "additional_spending", "plots_config"]
+
+    def __init__(
+        self,
+        offline: bool = False,
+        rebuild_snapshot: bool = False,
+        geometry_cache_bytes: int = 256 * 1024 * 1024,
+    ):
+        self._station_registry = StationRegistry.from_csv(
+            self._STATIONS_PATH, self._CUSTOM_STATIONS_PATH, self._STATIONS_CACHE_PATH
         )
-        self._trips, self._stations_slash_dict = self._import_trips(
-            os.environ["DATASHEET_ID"]
-        )
-        self._additional_spending: pd.DataFrame = self._import_additional_spending(
-            os.environ["DATASHEET_ID"], os.environ["ADDITIONAL_SPENDING_ID"]
+        if offline:
+            self._check_cached_sheets()
+        else:
+            self._download_sheets()
+
+        # Parse the sheets, unless a snapshot of the same inputs was already saved
+        # by the same parsing code
+        self._snapshot_key = combine_hashes(
+            file_sha256(self._TRIPS_PATH),
+            file_sha256(self._ADDITIONAL_SPENDING_PATH),
+            file_sha256(self._PLOTS_CONFIG_PATH),
+            self._station_registry.get_signature(),
+            *(
+                inspect.getsource(method)
+                for method in [
+                    TrainStatsData._parse_sheets,
+                    TrainStatsData._import_trips,
+                    TrainStatsData._localize_to_utc,
+                    TrainStatsData._import_additional_spending,
+                    TrainStatsData._import_plots_config,
+                ]
+            ),
         )
-        self._plots_config: pd.DataFrame = self._import_plots_config(
-            os.environ["DATASHEET_ID"], os.environ["PLOTS_CONFIG_ID"]
+        snapshot = None if rebuild_snapshot else self._load_snapshot()
+        if snapshot is None:
+            snapshot = self._parse_sheets()
+            self._save_snapshot(snapshot)
+        (
+            self._trips,
+            self._stations_slash_dict,
+            self._additional_spending,
+            self._plots_config,
+        ) = snapshot
+
+        self._geometry = GeometryStore.load_or_compile(
+            self._JOURNEYS_PATH, self._GEOMETRY_CACHE_PATH
         )
+        self._geometry_cache = ArrayLRUCache(geometry_cache_bytes)
+        self._segment_graph: Optional[SegmentGraph] = None
+        self._travel_counts: dict[str, TravelCounts] = {}
+        self._simplification_masks: dict[int, np.ndarray] = {}
 
     def get_past_trips(self, filter_start: datetime = None) -> pd.DataFrame:
         return self.get_trips(filter_start=filter_start, filter_end=self.NOW)
@@ -62,7 +112,24 @@ class TrainStatsData:
         return self._additional_spending.copy(deep=True)
 
     def get_plots_config(self) -> pd.DataFrame:
-        return self._plots_config.copy(deep=True)
+        return self._plots_config.replace({np.nan: None})
+
+    def verify_snapshot(self):
+        trips, stations_slash_dict, additional_spending, plots_config = (
+            self._parse_sheets()
+        )
+        pd.testing.assert_frame_equal(self._trips, trips, obj="trips")
+        pd.testing.assert_frame_equal(
+            self._additional_spending, additional_spending, obj="additional_spending"
+        )
+        pd.testing.assert_frame_equal(
+            self._plots_config, plots_config, obj="plots_config"
+        )
+        if self._stations_slash_dict != stations_slash_dict:
+            raise AssertionError(
+                "Snapshot stations_slash_dict differs from a fresh parse"
+            )
+        print("Snapshot matches a fresh parse")
 
     def get_journeys(
         self, filter_start: datetime = None, filter_end: datetime = None
@@ -123,26 +190,62 @@ class TrainStatsData:
 
         return distance_str, duration_str
 
-    def get_journey_coordinates(self, journey: str) -> np.ndarray:
-        geojson = self.get_geojson(journey)
-        return np.array(geojson["features"][0]["geometry"]["coordinates"])
+    def get_journey_coordinates(
+        self, journey: str, feature: int = 0, level: int = 0
+    ) -> np.ndarray:
+        # Read-only view into the store, or with vertices dropped by simplification
+        # an array shared with every other caller through the cache
+        if level == 0:
+            return self._geometry.get_coordinates(journey, feature)
+        return self._geometry_cache.get(
+            (journey, feature, level),
+            lambda: self._geometry.get_coordinates(
+                journey, feature, self._get_simplification_mask(level)
+            ),
+        )
 
-    def get_geojson(self, journey: str) -> dict:
-        with open(
-            self._JOURNEYS_PATH + journey + ".geojson", "r", encoding="utf8"
-        ) as f:
-            return json.load(f)
+    def get_journey_projected_parts(
+        self, journey: str, projection: Projection, extent: list[float], level=0
+    ) -> list[np.ndarray]:
+        # Only the parts of the journey within the projected extent, if any
+        return self._geometry.get_projected_parts(
+            journey,
+            projection,
+            extent,
+            keep=self._get_simplification_mask(level),
+        )
+
+    def get_geojson(self, journey: str, level: int = 0) -> dict:
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "properties": self._geometry.get_properties(journey, feature),
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": self.get_journey_coordinates(
+                            journey, feature, level
+                        ).tolist(),
+                    },
+                }
+                for feature in range(self._geometry.get_feature_count(journey))
+            ],
+        }
+
+    def get_geometry_cache_stats(self) -> dict[str, int]:
+        return self._geometry_cache.get_stats()
 
     def get_travel_coordinates(
         self, filter_start: datetime = None, filter_end: datetime = None
     ) -> pd.DataFrame:
         trips = self.get_trips(filter_start, filter_end)
-        all_coordinates = np.empty((0, 2))
+        all_coordinates = [np.empty((0, 2))]
 
         for journey in trips["journey"].tolist():
             coordinates = self.get_journey_coordinates(journey)
-            unique_coordinates = np.unique(coordinates, axis=0)
-            all_coordinates = np.append(all_coordinates, unique_coordinates, axis=0)
+            all_coordinates.append(unique_coordinates(coordinates))
+        all_coordinates = np.concatenate(all_coordinates)
 
         return pd.DataFrame(
             {
@@ -151,58 +254,153 @@ class TrainStatsData:
             }
         )
 
-    def get_travel_coordinate_couples(
+    def get_travel_coordinate_counts(
         self, filter_start: datetime = None, filter_end: datetime = None
     ) -> pd.DataFrame:
-        journeys = self.get_journeys(filter_start=filter_start, filter_end=filter_end)
-        all_coordinate_couples = np.empty((0, 4))
-        journeys_list = []
-        journeys_counts = []
+        # Same counts as grouping get_travel_coordinates by point
+        graph = self.get_segment_graph()
+        counts = self._get_travel_counts(filter_start, filter_end).node_counts
+        visited = counts > 0
+        coordinates = graph.get_node_coordinates()[visited]
 
-        for journey in tqdm(
-            journeys.index.tolist(), desc="Analyzing journey coordinates...", ncols=150
-        ):
-            coordinates = self.get_journey_coordinates(journey)
+        return pd.DataFrame(
+            {
+                "lon": coordinates[:, 0],
+                "lat": coordinates[:, 1],
+                "count": counts[visited],
+            }
+        )
 
-            # Find unique rows
-            unique_coordinates_sorted, sort_indices = np.unique(
-                coordinates, axis=0, return_index=True
-            )
+    def get_travel_segment_counts(
+        self, filter_start: datetime = None, filter_end: datetime = None, level=0
+    ) -> pd.DataFrame:
+        # Segments in order of first appearance, so that consecutive rows chain up
+        graph = self.get_segment_graph()
+        counts = self._get_travel_counts(filter_start, filter_end).edge_counts
+        if level > 0:
+            coordinates, counts = graph.get_simplified_edge_coordinates(counts, level)
+        else:
+            coordinates = graph.get_edge_coordinates()
+        visited = counts > 0
+        coordinates = coordinates[visited]
 
-            # Reorder to preserve the order of first occurrence
-            unique_coordinates = unique_coordinates_sorted[np.argsort(sort_indices)]
+        return pd.DataFrame(
+            {
+                "lon1": coordinates[:, 0],
+                "lat1": coordinates[:, 1],
+                "lon2": coordinates[:, 2],
+                "lat2": coordinates[:, 3],
+                "count": counts[visited],
+            }
+        )
 
-            # Initialize the array
-            unique_coordinate_couples = np.empty((len(unique_coordinates) - 1, 4))
+    def get_segment_graph(self) -> SegmentGraph:
+        if self._segment_graph is None:
+            self._segment_graph = SegmentGraph.load_or_build(
+                self._geometry, self._SEGMENT_GRAPH_PATH
+            )
+        return self._segment_graph
 
-            for i in range(len(unique_coordinate_couples)):
-                unique_coordinate_couples[i][0:2] = unique_coordinates[i]
-                unique_coordinate_couples[i][2:4] = unique_coordinates[i + 1][0:2]
+    def _get_simplification_mask(self, level: int) -> Optional[np.ndarray]:
+        # Store vertices kept at a simplification level, see utils.simplify
+        if level == 0:
+            return None
+        if level not in self._simplification_masks:
+            levels = self.get_segment_graph().get_vertex_levels(self._geometry)
+            self._simplification_masks[level] = levels >= level
+        return self._simplification_masks[level]
 
-            # Always fill with increasing longitude over the entire journey
-            if unique_coordinate_couples[0][0] > unique_coordinate_couples[-1][0]:
-                # Reverse coordinates
-                unique_coordinate_couples = unique_coordinate_couples[::-1]
+    def get_travel_coordinate_couples(
+        self, filter_start: datetime = None, filter_end: datetime = None
+    ) -> pd.DataFrame:
+        journeys = self.get_journeys(filter_start=filter_start, filter_end=filter_end)
+        lines = [self.get_journey_coordinates(journey) for journey in journeys.index]
+        coordinates = np.concatenate([np.empty((0, 2))] + lines)
+        vertex_journeys = np.repeat(
+            np.arange(len(lines)), [len(line) for line in lines]
+        )
 
-            all_coordinate_couples = np.append(
-                all_coordinate_couples, unique_coordinate_couples, axis=0
-            )
-            journeys_list += [journey] * len(unique_coordinate_couples)
-            journeys_counts += [journeys.loc[journey]["count"]] * len(
-                unique_coordinate_couples
+        # First occurrence of every point within its journey, grouping equal points
+        # of a journey next to each other while keeping their original order
+        keys = coordinate_keys(coordinates)
+        order = np.lexsort((keys, vertex_journeys))
+        group_starts = np.ones(len(order), dtype=bool)
+        group_starts[1:] = (np.diff(vertex_journeys[order]) != 0) | (
+            np.diff(keys[order]) != 0
+        )
+        first = np.zeros(len(order), dtype=bool)
+        first[order[group_starts]] = True
+
+        # Pair each point with the next one of the same journey
+        points = coordinates[first]
+        point_journeys = vertex_journeys[first]
+        paired = point_journeys[:-1] == point_journeys[1:]
+        coordinate_couples = np.hstack((points[:-1][paired], points[1:][paired]))
+        couple_journeys = point_journeys[:-1][paired]
+        couples_per_journey = np.bincount(couple_journeys, minlength=len(lines))
+
+        # Always fill with increasing longitude over the entire journey, reversing
+        # the couples of journeys whose first one starts east of their last one
+        starts = np.cumsum(couples_per_journey) - couples_per_journey
+        ends = starts + couples_per_journey - 1
+        paired_journeys = couples_per_journey > 0
+        reverse = np.zeros(len(lines), dtype=bool)
+        reverse[paired_journeys] = (
+            coordinate_couples[starts[paired_journeys], 0]
+            > coordinate_couples[ends[paired_journeys], 0]
+        )
+        positions = np.arange(len(coordinate_couples))
+        coordinate_couples = coordinate_couples[
+            np.where(
+                reverse[couple_journeys],
+                starts[couple_journeys] + ends[couple_journeys] - positions,
+                positions,
             )
+        ]
 
         return pd.DataFrame(
             {
-                "lon1": all_coordinate_couples[:, 0],
-                "lat1": all_coordinate_couples[:, 1],
-                "lon2": all_coordinate_couples[:, 2],
-                "lat2": all_coordinate_couples[:, 3],
-                "journey": journeys_list,
-                "count": journeys_counts,
+                "lon1": coordinate_couples[:, 0],
+                "lat1": coordinate_couples[:, 1],
+                "lon2": coordinate_couples[:, 2],
+                "lat2": coordinate_couples[:, 3],
+                "journey": np.repeat(journeys.index.to_numpy(), couples_per_journey),
+                "count": np.repeat(journeys["count"].to_numpy(), couples_per_journey),
             }
         )
 
+    def _get_travel_counts(
+        self, filter_start: datetime = None, filter_end: datetime = None
+    ) -> TravelCounts:
+        # One table per filter, a bound set to NOW keeping its table across days
+        # so that only the trips it gained or lost since the last run are folded in
+        key = combine_hashes(
+            *(
+                "now" if bound == self.NOW else str(bound)
+                for bound in [filter_start, filter_end]
+            )
+        )
+        path = os.path.join(self._TRAVEL_COUNTS_PATH, f"{key[:16]}.npz")
+        graph = self.get_segment_graph()
+        if key not in self._travel_counts:
+            self._travel_counts[key] = TravelCounts.load(path, graph)
+
+        trips = self.get_trips(filter_start, filter_end)
+        if self._travel_counts[key].update(
+            graph,
+            pd.Series(trips["journey"].to_numpy(), index=self._get_trip_keys(trips)),
+        ):
+            self._travel_counts[key].save(path)
+        return self._travel_counts[key]
+
+    def _get_trip_keys(self, trips: pd.DataFrame) -> np.ndarray:
+        # Content hash of each trip, numbered to tell identical trips apart
+        columns = ["journey", "Origin", "Destination", "Departure", "Arrival"]
+        keyed = trips[columns].assign(
+            occurrence=trips.groupby(columns, dropna=False).cumcount()
+        )
+        return pd.util.hash_pandas_object(keyed, index=False).to_numpy()
+
     def get_stations(
         self, filter_start: datetime = None, filter_end: datetime = None
     ) -> pd.DataFrame:
@@ -268,13 +466,15 @@ class TrainStatsData:
             )
 
         # Add latitude and longitude to the DataFrame
-        for station in result.index:
-            lat, lon = self._get_station_coordinates(station)
-            result.loc[station, "latitude"] = lat
-            result.loc[station, "longitude"] = lon
+        result[["latitude", "longitude"]] = self._station_registry.get_all_coordinates(
+            result.index.to_series()
+        )
 
-        # Sort the DataFrame by Visit_Count in descending order
-        return result.sort_values("Visit_Count", ascending=True)
+        # Sort the DataFrame by Visit_Count, ties by name so that the order does
+        # not depend on the set the stations were gathered in
+        return result.sort_index().sort_values(
+            "Visit_Count", ascending=True, kind="stable"
+        )
 
     def get_past_stations(self) -> pd.DataFrame:
         return self.get_stations(filter_end=self.NOW)
@@ -300,52 +500,106 @@ class TrainStatsData:
 
         return string
 
-    def _get_station_timezone(self, station: str) -> timezone:
-        custom_tz = self._custom_stations.loc[
-            self._custom_stations["name"] == station, "time_zone"
-        ].head(1)
-        if not custom_tz.empty:
-            return timezone(custom_tz.item())
-        stations_tz = self._stations.loc[
-            self._stations["name"] == station, "time_zone"
-        ].head(1)
-        if not stations_tz.empty:
-            return timezone(stations_tz.item())
-        else:
-            raise ValueError(
-                f"Could not find station name [{station}] in either standard or custom station CSVs."
+    def _localize_to_utc(
+        self, local_times: pd.Series, stations: pd.Series
+    ) -> pd.Series:
+        # Resolve each distinct station once, then localize all rows sharing a time zone at once
+        time_zones = self._station_registry.get_time_zones(stations)
+        localized = [
+            times.dt.tz_localize(time_zone).dt.tz_convert("UTC")
+            for time_zone, times in local_times.groupby(time_zones)
+        ]
+        if not localized:
+            # No trips, nothing to concatenate
+            return local_times.dt.tz_localize("UTC")
+        return pd.concat(localized).reindex(local_times.index)
+
+    def _download_sheets(self):
+        datasheet_id = os.environ["DATASHEET_ID"]
+        client = SheetsClient(self._SHEETS_CACHE_PATH)
+        try:
+            client.download_all(
+                [
+                    SheetExport(self._TRIPS_PATH, datasheet_id),
+                    SheetExport(
+                        self._ADDITIONAL_SPENDING_PATH,
+                        datasheet_id,
+                        os.environ["ADDITIONAL_SPENDING_ID"],
+                    ),
+                    SheetExport(
+                        self._PLOTS_CONFIG_PATH,
+                        datasheet_id,
+                        os.environ["PLOTS_CONFIG_ID"],
+                    ),
+                ]
             )
+        finally:
+            client.close()
+
+    def _check_cached_sheets(self):
+        paths = [
+            self._TRIPS_PATH,
+            self._ADDITIONAL_SPENDING_PATH,
+            self._PLOTS_CONFIG_PATH,
+        ]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(
+                f"Offline mode requires cached sheet exports, missing {', '.join(missing)}."
+            )
+        print("Offline mode, using cached sheet exports")
+
+    def _parse_sheets(
+        self,
+    ) -> tuple[pd.DataFrame, dict[str, str], pd.DataFrame, pd.DataFrame]:
+        trips, stations_slash_dict = self._import_trips()
+        return (
+            trips,
+            stations_slash_dict,
+            self._import_additional_spending(),
+            self._import_plots_config(),
+        )
 
-    def _get_station_coordinates(self, station: str) -> timezone:
-        custom_lat = self._custom_stations.loc[
-            self._custom_stations["name"] == station, "latitude"
-        ].head(1)
-        custom_lon = self._custom_stations.loc[
-            self._custom_stations["name"] == station, "longitude"
-        ].head(1)
-        if not custom_lat.empty and not custom_lon.empty:
-            return custom_lat.item(), custom_lon.item()
-        station_lat = self._stations.loc[
-            self._stations["name"] == station, "latitude"
-        ].head(1)
-        station_lon = self._stations.loc[
-            self._stations["name"] == station, "longitude"
-        ].head(1)
-        if not station_lat.empty and not station_lon.empty:
-            if not pd.isna(station_lat.item()) and not pd.isna(station_lon.item()):
-                return station_lat.item(), station_lon.item()
-
-        raise ValueError(
-            f"Could not find station name [{station}] in either standard or custom station CSVs."
-        )
-
-    def _import_trips(self, datasheet_id: str) -> (pd.DataFrame, dict[str:str]):
-        # Get trips dataset and save to file
-        r = get(
-            f"https://docs.google.com/spreadsheet/ccc?key={datasheet_id}&output=csv"
-        )
-        with open(self._TRIPS_PATH, "wb") as f:
-            f.write(r.content)
+    def _load_snapshot(
+        self,
+    ) -> Optional[tuple[pd.DataFrame, dict[str, str], pd.DataFrame, pd.DataFrame]]:
+        try:
+            with open(
+                os.path.join(self._SNAPSHOT_PATH, "meta.json"), "r", encoding="utf8"
+            ) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta["key"] != self._snapshot_key:
+            return None
+
+        trips, additional_spending, plots_config = [
+            pd.read_parquet(os.path.join(self._SNAPSHOT_PATH, f"{name}.parquet"))
+            for name in self._SNAPSHOT_FRAMES
+        ]
+        print("Loaded parsed sheets from snapshot")
+        return trips, meta["stations_slash_dict"], additional_spending, plots_config
+
+    def _save_snapshot(
+        self,
+        snapshot: tuple[pd.DataFrame, dict[str, str], pd.DataFrame, pd.DataFrame],
+    ):
+        trips, stations_slash_dict, additional_spending, plots_config = snapshot
+        os.makedirs(self._SNAPSHOT_PATH, exist_ok=True)
+        for name, frame in zip(
+            self._SNAPSHOT_FRAMES, [trips, additional_spending, plots_config]
+        ):
+            frame.to_parquet(os.path.join(self._SNAPSHOT_PATH, f"{name}.parquet"))
+        # Written last, so that an interrupted save is never picked up as valid
+        with open(
+            os.path.join(self._SNAPSHOT_PATH, "meta.json"), "w", encoding="utf8"
+        ) as f:
+            json.dump(
+                {"key": self._snapshot_key, "stations_slash_dict": stations_slash_dict},
+                f,
+            )
+
+    def _import_trips(self) -> (pd.DataFrame, dict[str:str]):
         trips = pd.read_csv(self._TRIPS_PATH, header=0, skiprows=[1])
 
         # Rework dataframe
@@ -358,21 +612,13 @@ class TrainStatsData:
             trips["Arrival (Local)"], format="mixed"
         )
 
-        trips["Arrival"] = trips["Arrival (Local)"]
-        trips["Departure"] = trips["Departure (Local)"]
-
-        # Localize departure and arrival times
-        for index, row in trips.iterrows():
-            origin = row["Origin"]
-            trips.loc[index, "Departure"] = trips.loc[index, "Departure"].tz_localize(
-                self._get_station_timezone(origin)
-            )
-            destination = row["Destination"]
-            trips.loc[index, "Arrival"] = trips.loc[index, "Arrival"].tz_localize(
-                self._get_station_timezone(destination)
-            )
-        trips["Departure"] = pd.to_datetime(trips["Departure"], utc=True)
-        trips["Arrival"] = pd.to_datetime(trips["Arrival"], utc=True)
+        # Localize departure and arrival times, Arrival being the first added column
+        trips["Arrival"] = self._localize_to_utc(
+            trips["Arrival (Local)"], trips["Destination"]
+        )
+        trips["Departure"] = self._localize_to_utc(
+            trips["Departure (Local)"], trips["Origin"]
+        )
 
         # Format durations
         trips["Duration"] = pd.to_timedelta(
@@ -408,15 +654,7 @@ class TrainStatsData:
 
         return trips, stations_slash_dict
 
-    def _import_additional_spending(
-        self, datasheet_id: str, additional_spending_id: str
-    ) -> pd.DataFrame:
-        # Get trips dataset and save to file
-        r = get(
-            f"https://docs.google.com/spreadsheet/ccc?key={datasheet_id}&gid={additional_spending_id}&output=csv"
-        )
-        with open(self._ADDITIONAL_SPENDING_PATH, "wb") as f:
-            f.write(r.content)
+    def _import_additional_spending(self) -> pd.DataFrame:
         additional_spending = pd.read_csv(
             self._ADDITIONAL_SPENDING_PATH, header=0, skiprows=[1]
         )
@@ -498,17 +736,10 @@ class TrainStatsData:
             {"Year": years, "Operator": operators, "Amount": amounts, "ID": ids}
         )
 
-    def _import_plots_config(
-        self, datasheet_id: str, plots_config_id: str
-    ) -> pd.DataFrame:
-        # Get trips dataset and save to file
-        r = get(
-            f"https://docs.google.com/spreadsheet/ccc?key={datasheet_id}&gid={plots_config_id}&output=csv"
-        )
-        with open(self._PLOTS_CONFIG_PATH, "wb") as f:
-            f.write(r.content)
+    def _import_plots_config(self) -> pd.DataFrame:
         plots_config_df = pd.read_csv(self._PLOTS_CONFIG_PATH, header=0)
         plots_config_df.dropna(axis=0, how="all", inplace=True)
+        # Columns that held blank rows are read as objects, type them from what remains
+        plots_config_df = plots_config_df.infer_objects()
         plots_config_df["Zoom level"] = plots_config_df["Zoom level"].astype("Int64")
-        plots_config_df.replace({np.nan: None}, inplace=True)
         return plots_config_df
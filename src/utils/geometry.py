@@ -0,0 +1,224 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from cartopy.crs import PlateCarree, Projection
+
+from .bounds import BoundingBoxIndex
+from .coordinates import SCALE
+from .hashing import combine_hashes
+
+
+class GeometryStore:
+    """All journey LineStrings packed into one int32 array of 1e-5 degree steps.
+
+    Coordinates projected for a map projection are cached next to the store, in
+    the same order, so that any journey is a slice of them too.
+    """
+
+    SCALE = SCALE
+
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        index: dict[str, list],
+        signature: str,
+        store_path: str = None,
+    ):
+        self.signature: str = signature
+        self._coordinates = coordinates
+        # Journey name -> list of [start, end, properties], one per LineString feature
+        self._index = index
+        self._store_path = store_path
+        # Degrees of every vertex, computed once for all journeys on first use
+        self._degrees: Optional[np.ndarray] = None
+        # Projection key -> (N, 2) float64 coordinates in that projection
+        self._projected: dict[str, np.ndarray] = {}
+        self._bounds: dict[str, BoundingBoxIndex] = {}
+
+    @classmethod
+    def load_or_compile(cls, journeys_path: str, store_path: str) -> "GeometryStore":
+        signature = cls._directory_signature(journeys_path)
+        try:
+            with open(
+                os.path.join(store_path, "index.json"), "r", encoding="utf8"
+            ) as f:
+                meta = json.load(f)
+            if meta["signature"] == signature:
+                coordinates = np.load(
+                    os.path.join(store_path, "coordinates.npy"), mmap_mode="r"
+                )
+                return cls(coordinates, meta["journeys"], signature, store_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        print("Compiling journey geometries...")
+        store = cls.compile(journeys_path, signature)
+        store.save(store_path)
+        store._store_path = store_path
+        return store
+
+    @classmethod
+    def compile(cls, journeys_path: str, signature: str) -> "GeometryStore":
+        chunks = []
+        index = {}
+        offset = 0
+        for file_name in sorted(os.listdir(journeys_path)):
+            if not file_name.endswith(".geojson"):
+                continue
+            with open(
+                os.path.join(journeys_path, file_name), "r", encoding="utf8"
+            ) as f:
+                geojson = json.load(f)
+            features = []
+            for feature in geojson["features"]:
+                coordinates = np.rint(
+                    np.array(feature["geometry"]["coordinates"]) * cls.SCALE
+                ).astype(np.int32)
+                chunks.append(coordinates)
+                features.append(
+                    [offset, offset + len(coordinates), feature.get("properties")]
+                )
+                offset += len(coordinates)
+            index[file_name.removesuffix(".geojson")] = features
+        return cls(np.concatenate(chunks), index, signature)
+
+    def save(self, store_path: str):
+        os.makedirs(store_path, exist_ok=True)
+        np.save(os.path.join(store_path, "coordinates.npy"), self._coordinates)
+        # Written last, so that an interrupted save is never picked up as valid
+        with open(os.path.join(store_path, "index.json"), "w", encoding="utf8") as f:
+            json.dump({"signature": self.signature, "journeys": self._index}, f)
+
+    def __contains__(self, journey: str) -> bool:
+        return journey in self._index
+
+    def get_journeys(self) -> list[str]:
+        return list(self._index.keys())
+
+    def get_vertex_count(self) -> int:
+        return len(self._coordinates)
+
+    def get_range(self, journey: str, feature: int = 0) -> tuple[int, int]:
+        # Position of the LineString in the store, as a [start, end) range
+        start, end, _ = self._get_features(journey)[feature]
+        return start, end
+
+    def get_quantized(self, journey: str, feature: int = 0) -> np.ndarray:
+        # Zero-copy view into the store, in units of 1 / SCALE degrees
+        start, end, _ = self._get_features(journey)[feature]
+        return self._coordinates[start:end]
+
+    def get_coordinates(
+        self, journey: str, feature: int = 0, keep: np.ndarray = None
+    ) -> np.ndarray:
+        # Read-only view into the store in degrees, unless vertices are dropped
+        start, end, _ = self._get_features(journey)[feature]
+        return _select(self._get_degrees(), start, end, keep)
+
+    def get_projected_parts(
+        self,
+        journey: str,
+        projection: Projection,
+        extent: list[float],
+        feature: int = 0,
+        keep: np.ndarray = None,
+    ) -> list[np.ndarray]:
+        """Projected parts of a journey that can be seen within a projected extent.
+
+        Parts are zero-copy views, unless a mask of the store vertices to keep is
+        given, in which case the ends of every part are kept too.
+        """
+        start, end, _ = self._get_features(journey)[feature]
+        key = _projection_key(projection)
+        if key not in self._bounds:
+            self._bounds[key] = BoundingBoxIndex(
+                self._get_projected_coordinates(projection),
+                [
+                    (start, end)
+                    for features in self._index.values()
+                    for start, end, _ in features
+                ],
+            )
+        projected = self._get_projected_coordinates(projection)
+        return [
+            _select(projected, part_start, part_end, keep)
+            for part_start, part_end in self._bounds[key].clip(start, end, extent)
+        ]
+
+    def get_feature_count(self, journey: str) -> int:
+        return len(self._get_features(journey))
+
+    def get_properties(self, journey: str, feature: int = 0) -> dict:
+        return self._get_features(journey)[feature][2]
+
+    def _get_features(self, journey: str) -> list:
+        try:
+            return self._index[journey]
+        except KeyError:
+            raise ValueError(f"Could not find geometry for journey [{journey}].")
+
+    def _get_degrees(self) -> np.ndarray:
+        # Dividing by SCALE gives back exactly the floats parsed from the GeoJSON
+        if self._degrees is None:
+            self._degrees = self._coordinates / self.SCALE
+            self._degrees.setflags(write=False)
+        return self._degrees
+
+    def _get_projected_coordinates(self, projection: Projection) -> np.ndarray:
+        key = _projection_key(projection)
+        if key not in self._projected:
+            self._projected[key] = self._load_or_project(projection, key)
+        return self._projected[key]
+
+    def _load_or_project(self, projection: Projection, key: str) -> np.ndarray:
+        if self._store_path is not None:
+            path = os.path.join(self._store_path, "projected", key)
+            try:
+                with open(path + ".json", "r", encoding="utf8") as f:
+                    meta = json.load(f)
+                if meta["signature"] == self.signature:
+                    return np.load(path + ".npy", mmap_mode="r")
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+        # Plain point transform of every vertex at once, lines being short enough
+        # not to need the densification cartopy applies to paths
+        print(f"Projecting journey geometries to {type(projection).__name__}...")
+        coordinates = self._get_degrees()
+        projected = projection.transform_points(
+            PlateCarree(), coordinates[:, 0], coordinates[:, 1]
+        )[:, :2]
+        projected.setflags(write=False)
+
+        if self._store_path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.save(path + ".npy", projected)
+            # Written last, so that an interrupted save is never picked up as valid
+            with open(path + ".json", "w", encoding="utf8") as f:
+                json.dump({"signature": self.signature, "srs": projection.srs}, f)
+        return projected
+
+    @staticmethod
+    def _directory_signature(journeys_path: str) -> str:
+        # Any added, removed or modified GeoJSON file changes the signature
+        entries = sorted(
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(journeys_path)
+            if entry.name.endswith(".geojson")
+        )
+        return combine_hashes(*(f"{n}|{m}|{s}" for n, m, s in entries))
+
+
+def _select(coordinates: np.ndarray, start: int, end: int, keep: np.ndarray):
+    if keep is None:
+        return coordinates[start:end]
+    # Line ends are kept whatever the mask, so that lines still meet
+    mask = keep[start:end].copy()
+    mask[[0, -1] if end > start else []] = True
+    return coordinates[start:end][mask]
+
+
+def _projection_key(projection: Projection) -> str:
+    return combine_hashes(projection.srs)[:16]
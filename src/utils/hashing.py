@@ -0,0 +1,13 @@
+import hashlib
+
+
+def file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def combine_hashes(*hashes: str) -> str:
+    return hashlib.sha256(":".join(hashes).encode("utf8")).hexdigest()
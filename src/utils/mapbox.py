@@ -1,22 +1,179 @@
+import io
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 
+import numpy as np
+import shapely.geometry as sgeom
+from cartopy.crs import PlateCarree
+from cartopy.img_transform import warp_array
 from cartopy.io.img_tiles import MapboxStyleTiles
 from dotenv import load_dotenv
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from .hashing import combine_hashes
+from .plotting import MapParams
+from .tiles import DirectoryTileSource, HttpTileSource, Tile, TileCache
 
 load_dotenv()
 
 
 class MapboxStyle(MapboxStyleTiles):
-    def __init__(self):
-        self.style_token = os.environ["MAPBOX_STYLE_TOKEN"]
-        self.username = os.environ["MAPBOX_USERNAME"]
-        self.map_id = os.environ["MAPBOX_STYLE_ID"]
-
-        super().__init__(
-            os.environ["MAPBOX_STYLE_TOKEN"],
-            os.environ["MAPBOX_USERNAME"],
-            os.environ["MAPBOX_STYLE_ID"],
+    """Mapbox style basemap, with tiles kept in a local cache between runs.
+
+    Tiles come from the Mapbox style by default. They can be served from a local
+    z/x/y.png directory with MAPBOX_TILES_DIR, or from any other server with a
+    MAPBOX_TILES_URL template, neither of which needs a Mapbox token.
+    """
+
+    TILE_CACHE_PATH = "../data/cache/tiles/"
+
+    def __init__(
+        self,
+        source=None,
+        cache_path: str = TILE_CACHE_PATH,
+        ttl_days: float = 30,
+        cache_mb: int = 512,
+    ):
+        self.style_token = os.environ.get("MAPBOX_STYLE_TOKEN")
+        self.username = os.environ.get("MAPBOX_USERNAME")
+        self.map_id = os.environ.get("MAPBOX_STYLE_ID")
+
+        super().__init__(self.style_token, self.username, self.map_id)
+
+        self.source = source or self._get_default_source()
+        self.tile_cache = TileCache(
+            os.path.join(cache_path, self.source.get_key()),
+            ttl_days * 24 * 3600,
+            cache_mb * 1024 * 1024,
         )
+        # Tiles replaced by placeholders, which basemaps must not be cached with
+        self.failed_tiles: int = 0
 
     def get_tile_url(self) -> str:
         return f"https://api.mapbox.com/styles/v1/{self.username}/{self.map_id}/tiles/{{z}}/{{x}}/{{y}}?access_token={self.style_token}"
+
+    def get_image(self, tile: Tile):
+        data = self.tile_cache.get(tile)
+        if data is None:
+            try:
+                data = self.source.fetch(tile)
+            except OSError as err:
+                # Same light grey placeholder as cartopy, not cached
+                print(err)
+                self.failed_tiles += 1
+                image = Image.fromarray(np.full((256, 256, 3), 250, dtype=np.uint8))
+                return image, self.tileextent(tile), "lower"
+            self.tile_cache.put(tile, data)
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        return image, self.tileextent(tile), "lower"
+
+    def add_basemap(self, ax, params: MapParams, regrid_shape: int = 3000):
+        """Paint the basemap of a map, as add_image would, in a single imshow.
+
+        The basemap warped into the map projection is kept in the tile cache, keyed
+        by everything it depends on, and expires along with the tiles.
+        """
+        target_extent = ax.get_extent(ax.projection)
+        key = combine_hashes(
+            *map(str, params.get_extent() + list(params.get_fig_size())),
+            str(params.zoom_level),
+            params.map_projection.srs,
+            str(regrid_shape),
+            f"{target_extent}",
+        )[:16]
+        name = os.path.join("basemaps", f"{key}.png")
+
+        data = self.tile_cache.read(name)
+        if data is None:
+            failed_tiles = self.failed_tiles
+            image, extent = self._warp_basemap(ax, params.zoom_level, regrid_shape)
+            if self.failed_tiles == failed_tiles:
+                info = PngInfo()
+                info.add_text("extent", json.dumps(extent))
+                buffer = io.BytesIO()
+                Image.fromarray(image).save(buffer, format="png", pnginfo=info)
+                self.tile_cache.write(name, buffer.getvalue())
+            else:
+                print("Basemap not cached, some of its tiles could not be fetched")
+        else:
+            png = Image.open(io.BytesIO(data))
+            image, extent = np.asarray(png), json.loads(png.text["extent"])
+        ax.imshow(image, extent=extent, origin="lower", transform=ax.projection)
+
+    def prefetch(self, maps: list[MapParams]):
+        """Download every tile the maps need that is not cached yet, concurrently."""
+        tiles = set()
+        for params in maps:
+            tiles.update(self.find_images(_get_domain(self, params), params.zoom_level))
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=TileCache.MAX_THREADS) as executor:
+            fetched = sum(executor.map(self._prefetch_tile, tiles))
+        evicted = self.tile_cache.evict()
+        print(
+            f"Basemap tiles: {len(tiles)} needed, {fetched} downloaded in "
+            f"{perf_counter() - start:.1f} s, {evicted} evicted from the cache"
+        )
+
+    def _prefetch_tile(self, tile: Tile) -> bool:
+        if self.tile_cache.get(tile) is not None:
+            return False
+        try:
+            self.tile_cache.put(tile, self.source.fetch(tile))
+        except OSError as err:
+            print(err)
+            return False
+        return True
+
+    def _warp_basemap(self, ax, zoom: int, regrid_shape: int):
+        # Same steps as the cartopy tile pipeline run when drawing the map
+        image, extent, origin = self.image_for_domain(
+            ax._get_extent_geom(self.crs), zoom
+        )
+        image = np.asanyarray(image)
+        if origin == "upper":
+            image = image[::-1]
+        target_extent = ax.get_extent(ax.projection)
+        image, extent = warp_array(
+            image,
+            source_proj=self.crs,
+            source_extent=extent,
+            target_proj=ax.projection,
+            target_res=ax._regrid_shape_aspect(regrid_shape, target_extent),
+            target_extent=target_extent,
+            mask_extrapolated=True,
+        )
+
+        # Areas outside of the tiles made transparent
+        rgba = np.full(image.shape[:2] + (4,), 255, dtype=np.uint8)
+        rgba[..., :3] = np.ma.getdata(image)[..., :3]
+        rgba[np.ma.getmaskarray(image)[..., :3].any(axis=-1), 3] = 0
+        return rgba, [float(value) for value in extent]
+
+    def _get_default_source(self):
+        if "MAPBOX_TILES_DIR" in os.environ:
+            return DirectoryTileSource(os.environ["MAPBOX_TILES_DIR"])
+        if "MAPBOX_TILES_URL" in os.environ:
+            return HttpTileSource(os.environ["MAPBOX_TILES_URL"])
+        if not (self.style_token and self.username and self.map_id):
+            raise ValueError(
+                "MAPBOX_STYLE_TOKEN, MAPBOX_USERNAME and MAPBOX_STYLE_ID are required "
+                "without MAPBOX_TILES_DIR or MAPBOX_TILES_URL."
+            )
+        return HttpTileSource(
+            f"https://api.mapbox.com/styles/v1/{self.username}/{self.map_id}"
+            f"/tiles/256/{{z}}/{{x}}/{{y}}?access_token={self.style_token}"
+        )
+
+
+def _get_domain(tiles: MapboxStyleTiles, params: MapParams):
+    # Area drawn by a map, as set_extent frames it, in the tiles' projection
+    projection = params.map_projection
+    lon_min, lon_max, lat_min, lat_max = params.get_extent()
+    frame = projection.project_geometry(
+        sgeom.box(lon_min, lat_min, lon_max, lat_max), PlateCarree()
+    )
+    return tiles.crs.project_geometry(sgeom.box(*frame.bounds), projection)
@@ -3,8 +3,11 @@ from math import prod, ceil, floor
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
 from PIL import Image
 
+from .simplify import get_level
+
 GITHUB_BADGE = Image.open("../assets/GitHub.png")
 
 GITHUB_DARK = "#0D1117"
@@ -23,6 +26,11 @@ COLORS = [COLORS_DICT[i] for i in COLORS]
 
 MAX_DAYS_PER_YEAR = 366
 
+SAVE_DPI = 500
+
+# Figure height left under maps by finish_map
+MAP_BOTTOM = 0.12
+
 MONTHS_TICKS = [1, 32, 61, 92, 122, 153, 183, 214, 245, 275, 306, 336]
 
 MONTHS_LABELS = [
@@ -78,6 +86,50 @@ def dark_figure(subplots=(1, 1), figsize=(7, 5.2), projection=None, grid=False):
     return fig, axes
 
 
+def get_clip_extent(ax, margin=0.05) -> list[float]:
+    """Projected extent of a map, widened by a fraction of its size on every side."""
+    x_min, x_max, y_min, y_max = ax.get_extent()
+    dx, dy = (x_max - x_min) * margin, (y_max - y_min) * margin
+    return [x_min - dx, x_max + dx, y_min - dy, y_max + dy]
+
+
+def get_simplification_level(fig, ax, params) -> int:
+    """Coarsest geometry simplification level within half a saved pixel of a map."""
+    pixels = ax.get_window_extent().height * SAVE_DPI / fig.dpi
+    return get_level((params.get_lat_max() - params.get_lat_min()) / pixels / 2)
+
+
+def add_line_groups(
+    ax, lines, colors, linestyles, zorders, linewidth, transform
+) -> list[LineCollection]:
+    """Draw lines as one LineCollection per group of solid or dashed lines and zorder.
+
+    Lines keep their own color and line style within a group. Solid lines get round
+    caps, as with solid_capstyle="round", dashed ones the default butt caps.
+    """
+    groups = {}
+    for line, color, linestyle, zorder in zip(lines, colors, linestyles, zorders):
+        group = groups.setdefault((linestyle == "-", zorder), ([], [], []))
+        group[0].append(line)
+        group[1].append(color)
+        group[2].append(linestyle)
+
+    collections = []
+    for (solid, zorder), (group_lines, group_colors, group_styles) in groups.items():
+        collection = LineCollection(
+            group_lines,
+            colors=group_colors,
+            linestyles=group_styles,
+            linewidths=linewidth,
+            capstyle="round" if solid else "butt",
+            transform=transform,
+            zorder=zorder,
+        )
+        ax.add_collection(collection, autolim=False)
+        collections.append(collection)
+    return collections
+
+
 def finish_map(
     fig,
     _axes,
@@ -91,7 +143,7 @@ def finish_map(
         colorbar.ax.xaxis.set_tick_params(color="white")
         colorbar.outline.set_edgecolor("white")
         plt.setp(plt.getp(colorbar.ax, "xticklabels"), color="white", fontsize=8)
-    fig.subplots_adjust(bottom=0.12)
+    fig.subplots_adjust(bottom=MAP_BOTTOM)
     if logo_position:
         fig_axes2 = fig.add_axes(logo_position, anchor="NW", zorder=1)
     else:
@@ -99,8 +151,10 @@ def finish_map(
     fig_axes2.imshow(GITHUB_BADGE)
     fig_axes2.axis("off")
     if save_transparent:
-        plt.savefig("../plots/" + path + "_transparent.png", transparent=True, dpi=500)
-    plt.savefig("../plots/" + path + ".png", transparent=False, dpi=500)
+        plt.savefig(
+            "../plots/" + path + "_transparent.png", transparent=True, dpi=SAVE_DPI
+        )
+    plt.savefig("../plots/" + path + ".png", transparent=False, dpi=SAVE_DPI)
     if show:
         plt.show()
     plt.close()
@@ -136,8 +190,10 @@ def finish_figure(
     fig_axes2.imshow(GITHUB_BADGE)
     fig_axes2.axis("off")
     if save_transparent:
-        plt.savefig("../plots/" + path + "_transparent.png", transparent=True, dpi=500)
-    plt.savefig("../plots/" + path + ".png", transparent=False, dpi=500)
+        plt.savefig(
+            "../plots/" + path + "_transparent.png", transparent=True, dpi=SAVE_DPI
+        )
+    plt.savefig("../plots/" + path + ".png", transparent=False, dpi=SAVE_DPI)
     if show:
         plt.show()
     plt.close()
@@ -0,0 +1,164 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+# Decimals of the encoded coordinates, past which they no longer fit the 32 bits
+# integers of the decoder
+MAX_PRECISION = 6
+
+
+def get_precision(tolerance: float) -> int:
+    """Fewest decimals rounding coordinates by no more than a tolerance, in degrees."""
+    return min(int(np.ceil(-np.log10(2 * tolerance))), MAX_PRECISION)
+
+
+def encode_polyline(coordinates: np.ndarray, precision: int) -> str:
+    """Lon/lat coordinates as a Google encoded polyline, rounded to some decimals.
+
+    Every latitude and longitude is stored as its difference with the previous one,
+    zigzag encoded and written as 5 bits chunks, least significant first, each
+    chunk but the last of a value being flagged with 0x20.
+    """
+    values = np.round(coordinates[:, ::-1] * 10**precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), np.int64)).ravel()
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+
+    shifts = 5 * np.arange(7)
+    chunks = (zigzag[:, None] >> shifts) & 0x1F
+    lengths = 1 + ((zigzag[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    codes = chunks + 63 + 0x20 * (np.arange(7) < lengths[:, None] - 1)
+    return codes[np.arange(7) < lengths[:, None]].astype(np.uint8).tobytes().decode()
+
+
+# Functions decoding the features of encode_features in the browser
+DECODE_FEATURES_JS = """
+    function decode(text, factor) {
+        var coordinates = [], index = 0, lat = 0, lon = 0;
+        while (index < text.length) {
+            var values = [0, 0];
+            for (var k = 0; k < 2; k++) {
+                var shift = 0, result = 0, code;
+                do {
+                    code = text.charCodeAt(index++) - 63;
+                    result |= (code & 0x1f) << shift;
+                    shift += 5;
+                } while (code >= 0x20);
+                values[k] = result & 1 ? ~(result >> 1) : result >> 1;
+            }
+            lat += values[0];
+            lon += values[1];
+            coordinates.push([lon / factor, lat / factor]);
+        }
+        return coordinates;
+    }
+    function decodeFeatures(data) {
+        return {
+            type: "FeatureCollection",
+            features: data.lines.map(function (line, i) {
+                return {
+                    type: "Feature",
+                    properties: data.properties[data.indices[i]],
+                    geometry: {
+                        type: "LineString",
+                        coordinates: decode(line, data.factor),
+                    },
+                };
+            }),
+        };
+    }
+"""
+
+
+def encode_features(features: list[tuple[dict, np.ndarray]], precision: int) -> str:
+    """Line features as JSON of encoded polylines, decoded by DECODE_FEATURES_JS.
+
+    Features are given as (properties, coordinates) couples. Features sharing their
+    properties object, like the parts of a journey, share it in the JSON too.
+    """
+    properties, indices, positions = [], [], {}
+    for feature_properties, _ in features:
+        if id(feature_properties) not in positions:
+            positions[id(feature_properties)] = len(properties)
+            properties.append(feature_properties)
+        indices.append(positions[id(feature_properties)])
+    lines = [encode_polyline(coordinates, precision) for _, coordinates in features]
+    return (
+        f'{{"factor":{10**precision},"properties":{_to_script_json(properties)},'
+        f'"indices":{_to_script_json(indices)},"lines":{_to_script_json(lines)}}}'
+    )
+
+
+class EncodedGeoJson(MacroElement):
+    """Line features added to a folium GeoJson layer from encoded polylines.
+
+    Features are decoded in the browser, the layer styling them as if they had been
+    part of its data. They are inlined in the page, or once given its URL, loaded
+    from a separate file without blocking the page.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function () {"""
+        + DECODE_FEATURES_JS
+        + """
+            function add(data) {
+                {{ this.layer.get_name() }}.addData(decodeFeatures(data));
+            }
+            {%- if this.url %}
+            $.ajax({{ this.url|tojson }}, {dataType: "json"}).done(add);
+            {%- else %}
+            add({{ this.get_json() }});
+            {%- endif %}
+        })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, layer, features: list[tuple[dict, np.ndarray]], precision: int):
+        super().__init__()
+        self._name = "EncodedGeoJson"
+        self.layer = layer
+        self.url: Optional[str] = None
+        self._json: str = encode_features(features, precision)
+
+        # Size of the same features as plain GeoJSON, for comparison
+        self.plain_size: int = len(
+            _to_script_json(
+                [
+                    {
+                        "type": "Feature",
+                        "properties": feature_properties,
+                        "geometry": {
+                            "type": "LineString",
+                            "coordinates": coordinates.tolist(),
+                        },
+                    }
+                    for feature_properties, coordinates in features
+                ]
+            )
+        )
+
+    def get_json(self) -> str:
+        return self._json
+
+    def get_size(self) -> int:
+        return len(self._json)
+
+    def print_size(self, path: str):
+        """Print the size of a saved page, and its size with plain GeoJSON features."""
+        size = os.path.getsize(path)
+        print(
+            f"HTML size: {size / 1e6:.2f} MB with encoded geometries, about "
+            f"{(size - self.get_size() + self.plain_size) / 1e6:.2f} MB as plain GeoJSON"
+        )
+
+
+def _to_script_json(value) -> str:
+    # Safe to inline in a script element, and in the template folium makes of it,
+    # the braces being within strings since objects cannot directly nest
+    return json.dumps(value).replace("</", "<\\/").replace("{{", "{\\u007b")
@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.ndimage import maximum_filter
+
+AGGREGATIONS = ["max", "sum"]
+
+
+class DensityRaster:
+    """Weighted counts accumulated on a pixel grid covering a rectangular extent.
+
+    With the "max" aggregation a pixel holds the largest weight drawn over it, as
+    when drawing the heaviest points last. With "sum" it holds the total weight of
+    its points, segments adding their weight once per pixel of length.
+    Rows go from the bottom of the extent to the top, as drawn with origin="lower".
+    """
+
+    def __init__(self, extent: list[float], shape: tuple[int, int], aggregation="max"):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown raster aggregation: {aggregation}.")
+        self.extent: list[float] = extent
+        self.shape: tuple[int, int] = shape
+        self.aggregation: str = aggregation
+        self._values = np.zeros(shape[0] * shape[1])
+
+    def add_points(self, x: np.ndarray, y: np.ndarray, weights: np.ndarray):
+        pixels, inside = self._get_pixels(x, y)
+        self._accumulate(pixels, weights[inside])
+
+    def add_segments(
+        self,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        x2: np.ndarray,
+        y2: np.ndarray,
+        weights: np.ndarray,
+    ):
+        # Sample every segment at least once per pixel along its length
+        x_min, x_max, y_min, y_max = self.extent
+        length = np.hypot(
+            (x2 - x1) / (x_max - x_min) * self.shape[1],
+            (y2 - y1) / (y_max - y_min) * self.shape[0],
+        )
+        samples = np.ceil(length).astype(np.int64) + 1
+        segments = np.repeat(np.arange(len(samples)), samples)
+        starts = np.cumsum(samples) - samples
+        steps = (np.arange(len(segments)) - starts[segments]) / np.maximum(
+            samples[segments] - 1, 1
+        )
+        if self.aggregation == "sum":
+            # Spread the weight along the segment, however finely it is sampled,
+            # leaving its end point to the segment that follows
+            weights = weights * length / np.maximum(samples - 1, 1)
+            segments, steps = segments[steps < 1], steps[steps < 1]
+        pixels, inside = self._get_pixels(
+            x1[segments] + steps * (x2 - x1)[segments],
+            y1[segments] + steps * (y2 - y1)[segments],
+        )
+        self._accumulate(pixels, weights[segments[inside]])
+
+    def get_image(self, width: int = 1) -> np.ma.MaskedArray:
+        """Aggregated values, widened to `width` pixels, with empty pixels masked."""
+        values = self._values.reshape(self.shape)
+        if width > 1:
+            values = maximum_filter(values, size=width)
+        return np.ma.masked_equal(values, 0)
+
+    def _get_pixels(self, x: np.ndarray, y: np.ndarray):
+        # Flat pixel index of the points inside the extent, and which points they are
+        x_min, x_max, y_min, y_max = self.extent
+        columns = np.floor((x - x_min) / (x_max - x_min) * self.shape[1])
+        rows = np.floor((y - y_min) / (y_max - y_min) * self.shape[0])
+        inside = (
+            (columns >= 0)
+            & (columns < self.shape[1])
+            & (rows >= 0)
+            & (rows < self.shape[0])
+        )
+        pixels = rows[inside].astype(np.int64) * self.shape[1] + columns[inside]
+        return pixels.astype(np.int64), inside
+
+    def _accumulate(self, pixels: np.ndarray, weights: np.ndarray):
+        if self.aggregation == "max":
+            np.maximum.at(self._values, pixels, weights)
+        else:
+            self._values += np.bincount(
+                pixels, weights=weights, minlength=self._values.size
+            )
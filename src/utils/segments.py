@@ -0,0 +1,350 @@
+import os
+from zipfile import BadZipFile
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from .coordinates import quantized_keys
+from .geometry import GeometryStore
+from .simplify import KEEP_LEVEL, get_chains, get_importance, get_levels
+
+# Missing, truncated or otherwise unreadable .npz files, which are built again
+NPZ_LOAD_ERRORS = (OSError, EOFError, ValueError, KeyError, BadZipFile)
+
+
+class SegmentGraph:
+    """Deduplicated rail segments of all journeys, with journey incidence matrices.
+
+    Nodes are the distinct quantized coordinates of the geometry store, edges the
+    distinct segments between consecutive points, regardless of their direction.
+    Edges are numbered by first appearance and keep the orientation they were
+    first traversed with, so that consecutive edges of a journey chain up.
+
+    Nodes also get a simplification level, computed over the chains of nodes
+    between junctions rather than per journey, so that journeys sharing a chain
+    keep the same nodes along it at every level.
+    """
+
+    def __init__(
+        self,
+        journeys: list[str],
+        node_coordinates: np.ndarray,
+        vertex_nodes: np.ndarray,
+        edge_nodes: np.ndarray,
+        journey_nodes: csr_matrix,
+        journey_edges: csr_matrix,
+        chain_nodes: np.ndarray,
+        chain_offsets: np.ndarray,
+        chain_edges: np.ndarray,
+        node_levels: np.ndarray,
+        signature: str,
+    ):
+        self.signature: str = signature
+        self._journeys = pd.Index(journeys)
+        self._node_coordinates = node_coordinates
+        # Node of every vertex of the journeys' first LineString, in store order
+        self._vertex_nodes = vertex_nodes
+        self._edge_nodes = edge_nodes
+        self._journey_nodes = journey_nodes
+        self._journey_edges = journey_edges
+        # Nodes of every chain end to end, and the edge between consecutive ones
+        self._chain_nodes = chain_nodes
+        self._chain_offsets = chain_offsets
+        self._chain_edges = chain_edges
+        self._node_levels = node_levels
+
+    @classmethod
+    def load_or_build(cls, store: GeometryStore, path: str) -> "SegmentGraph":
+        try:
+            with np.load(path) as graph:
+                if str(graph["signature"]) == store.signature:
+                    return cls._from_arrays(graph)
+        except NPZ_LOAD_ERRORS:
+            pass
+
+        print("Building rail segment graph...")
+        graph = cls.build(store)
+        graph.save(path)
+        return graph
+
+    @classmethod
+    def build(cls, store: GeometryStore) -> "SegmentGraph":
+        journeys = store.get_journeys()
+        parts = [store.get_quantized(journey) for journey in journeys]
+        vertex_journeys = np.repeat(np.arange(len(journeys)), [len(p) for p in parts])
+
+        vertices = np.concatenate(parts)
+        _, node_vertices, vertex_nodes = np.unique(
+            quantized_keys(vertices), return_index=True, return_inverse=True
+        )
+        node_coordinates = vertices[node_vertices]
+
+        # Segments between consecutive distinct points of the same journey
+        starts, ends = vertex_nodes[:-1], vertex_nodes[1:]
+        valid = (vertex_journeys[:-1] == vertex_journeys[1:]) & (starts != ends)
+        starts, ends = starts[valid], ends[valid]
+        segment_journeys = vertex_journeys[:-1][valid]
+
+        # Deduplicate segments in either direction, numbering them by first appearance
+        edge_keys = np.minimum(starts, ends).astype(np.int64) * len(
+            node_coordinates
+        ) + np.maximum(starts, ends)
+        distinct_keys, first_segments, segment_edges = np.unique(
+            edge_keys, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first_segments)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        segment_edges = rank[segment_edges.ravel()]
+        first_segments = first_segments[order]
+        edge_nodes = np.column_stack((starts[first_segments], ends[first_segments]))
+
+        # Simplification levels, over chains of nodes between junctions
+        chain_nodes, chain_offsets = get_chains(
+            np.split(vertex_nodes, np.cumsum([len(p) for p in parts])[:-1]),
+            np.bincount(edge_nodes.ravel(), minlength=len(node_coordinates)),
+        )
+        node_levels = get_levels(
+            get_importance(
+                node_coordinates / GeometryStore.SCALE, chain_nodes, chain_offsets
+            )
+        )
+        chain_starts, chain_ends = chain_nodes[:-1], chain_nodes[1:]
+        within = ~np.isin(np.arange(1, len(chain_nodes)), chain_offsets)
+        chain_edges = rank[
+            np.searchsorted(
+                distinct_keys,
+                np.minimum(chain_starts, chain_ends)[within].astype(np.int64)
+                * len(node_coordinates)
+                + np.maximum(chain_starts, chain_ends)[within],
+            )
+        ]
+
+        return cls(
+            journeys,
+            node_coordinates,
+            vertex_nodes,
+            edge_nodes,
+            _incidence(
+                vertex_journeys, vertex_nodes, len(journeys), len(node_coordinates)
+            ),
+            _incidence(segment_journeys, segment_edges, len(journeys), len(edge_nodes)),
+            chain_nodes,
+            chain_offsets,
+            chain_edges,
+            node_levels,
+            store.signature,
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path,
+            signature=self.signature,
+            journeys=np.array(self._journeys, dtype=str),
+            node_coordinates=self._node_coordinates,
+            vertex_nodes=self._vertex_nodes,
+            edge_nodes=self._edge_nodes,
+            journey_nodes_indptr=self._journey_nodes.indptr,
+            journey_nodes_indices=self._journey_nodes.indices,
+            journey_edges_indptr=self._journey_edges.indptr,
+            journey_edges_indices=self._journey_edges.indices,
+            chain_nodes=self._chain_nodes,
+            chain_offsets=self._chain_offsets,
+            chain_edges=self._chain_edges,
+            node_levels=self._node_levels,
+        )
+
+    @classmethod
+    def _from_arrays(cls, graph) -> "SegmentGraph":
+        journeys = graph["journeys"].tolist()
+        node_coordinates = graph["node_coordinates"]
+        edge_nodes = graph["edge_nodes"]
+        return cls(
+            journeys,
+            node_coordinates,
+            graph["vertex_nodes"],
+            edge_nodes,
+            _binary_csr(
+                graph["journey_nodes_indptr"],
+                graph["journey_nodes_indices"],
+                (len(journeys), len(node_coordinates)),
+            ),
+            _binary_csr(
+                graph["journey_edges_indptr"],
+                graph["journey_edges_indices"],
+                (len(journeys), len(edge_nodes)),
+            ),
+            graph["chain_nodes"],
+            graph["chain_offsets"],
+            graph["chain_edges"],
+            graph["node_levels"],
+            str(graph["signature"]),
+        )
+
+    def get_node_count(self) -> int:
+        return len(self._node_coordinates)
+
+    def get_edge_count(self) -> int:
+        return len(self._edge_nodes)
+
+    def get_node_coordinates(self) -> np.ndarray:
+        return self._node_coordinates / GeometryStore.SCALE
+
+    def get_edge_coordinates(self) -> np.ndarray:
+        # lon1, lat1, lon2, lat2 of every edge, in its stored orientation
+        return (
+            np.hstack(
+                (
+                    self._node_coordinates[self._edge_nodes[:, 0]],
+                    self._node_coordinates[self._edge_nodes[:, 1]],
+                )
+            )
+            / GeometryStore.SCALE
+        )
+
+    def get_vertex_levels(self, store: GeometryStore) -> np.ndarray:
+        """Simplification level of every vertex of the store, see simplify.get_level.
+
+        Only the first LineString of journeys is simplified, others keep every vertex.
+        """
+        levels = np.full(store.get_vertex_count(), KEEP_LEVEL, dtype=np.uint8)
+        offset = 0
+        for journey in self._journeys:
+            start, end = store.get_range(journey)
+            levels[start:end] = self._node_levels[
+                self._vertex_nodes[offset : offset + end - start]
+            ]
+            offset += end - start
+        return levels
+
+    def get_simplified_edge_coordinates(
+        self, edge_counts: np.ndarray, level: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Segments between the nodes kept at a level, with their largest edge count.
+
+        Segments go along chains, so that consecutive ones chain up as edges do.
+        """
+        lengths = np.diff(np.append(self._chain_offsets, len(self._chain_nodes)))
+        chains = np.repeat(np.arange(len(lengths)), lengths)
+        last = np.zeros(len(self._chain_nodes), dtype=bool)
+        last[self._chain_offsets + lengths - 1] = True
+
+        # Chain ends are always kept, so every segment ends within its own chain
+        kept = np.flatnonzero(self._node_levels[self._chain_nodes] >= level)
+        starts = kept[~last[kept]]
+        ends = kept[np.searchsorted(kept, starts, side="right")]
+        counts = np.maximum.reduceat(
+            edge_counts[self._chain_edges], starts - chains[starts]
+        )
+        coordinates = (
+            np.hstack(
+                (
+                    self._node_coordinates[self._chain_nodes[starts]],
+                    self._node_coordinates[self._chain_nodes[ends]],
+                )
+            )
+            / GeometryStore.SCALE
+        )
+        return coordinates, counts
+
+    def get_node_counts(self, journey_counts: pd.Series) -> np.ndarray:
+        # Number of trips through each node, counting a node once per trip
+        return self._journey_nodes.T @ self._get_weights(journey_counts)
+
+    def get_edge_counts(self, journey_counts: pd.Series) -> np.ndarray:
+        # Number of trips along each edge, counting an edge once per trip
+        return self._journey_edges.T @ self._get_weights(journey_counts)
+
+    def _get_weights(self, journey_counts: pd.Series) -> np.ndarray:
+        unknown = journey_counts.index.difference(self._journeys)
+        if not unknown.empty:
+            raise ValueError(
+                f"Could not find geometry for journeys {', '.join(f'[{j}]' for j in unknown)}."
+            )
+        return journey_counts.reindex(self._journeys, fill_value=0).to_numpy()
+
+
+class TravelCounts:
+    """Node and edge trip counts, persisted with the trips they were computed from.
+
+    Each update only folds in the trips added or removed since the last one, an
+    edited trip being seen as removed then added again under a new key.
+    """
+
+    def __init__(
+        self,
+        signature: str,
+        trips: pd.Series,
+        node_counts: np.ndarray,
+        edge_counts: np.ndarray,
+    ):
+        self.signature: str = signature
+        # Journey of every trip folded in, indexed by trip key
+        self._trips = trips
+        self.node_counts: np.ndarray = node_counts
+        self.edge_counts: np.ndarray = edge_counts
+
+    @classmethod
+    def load(cls, path: str, graph: SegmentGraph) -> "TravelCounts":
+        try:
+            with np.load(path) as counts:
+                if str(counts["signature"]) == graph.signature:
+                    return cls(
+                        graph.signature,
+                        pd.Series(counts["trip_journeys"], index=counts["trip_keys"]),
+                        counts["node_counts"],
+                        counts["edge_counts"],
+                    )
+        except NPZ_LOAD_ERRORS:
+            pass
+
+        # No counts yet, unreadable ones or geometries changed, every trip will be folded in again
+        return cls(
+            graph.signature,
+            pd.Series([], index=np.array([], dtype=np.uint64), dtype=str),
+            np.zeros(graph.get_node_count(), dtype=np.int64),
+            np.zeros(graph.get_edge_count(), dtype=np.int64),
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path,
+            signature=self.signature,
+            trip_keys=self._trips.index.to_numpy(dtype=np.uint64),
+            trip_journeys=self._trips.to_numpy(dtype=str),
+            node_counts=self.node_counts,
+            edge_counts=self.edge_counts,
+        )
+
+    def update(self, graph: SegmentGraph, trips: pd.Series) -> bool:
+        """Fold in the difference with the given trips, returns whether any."""
+        added = trips[~trips.index.isin(self._trips.index)]
+        removed = self._trips[~self._trips.index.isin(trips.index)]
+        if added.empty and removed.empty:
+            return False
+
+        delta = (
+            added.value_counts()
+            .sub(removed.value_counts(), fill_value=0)
+            .astype(np.int64)
+        )
+        self.node_counts = self.node_counts + graph.get_node_counts(delta)
+        self.edge_counts = self.edge_counts + graph.get_edge_counts(delta)
+        self._trips = trips.copy()
+        print(f"Travel counts: {len(added)} trips added, {len(removed)} removed")
+        return True
+
+
+def _incidence(rows: np.ndarray, columns: np.ndarray, n_rows: int, n_columns: int):
+    matrix = csr_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, columns)), shape=(n_rows, n_columns)
+    )
+    matrix.sum_duplicates()
+    return _binary_csr(matrix.indptr, matrix.indices, matrix.shape)
+
+
+def _binary_csr(indptr: np.ndarray, indices: np.ndarray, shape: tuple[int, int]):
+    return csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr), shape)
@@ -0,0 +1,123 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Optional
+
+from dotenv import load_dotenv
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .hashing import file_sha256
+
+load_dotenv()
+
+
+class SheetExport:
+    def __init__(self, path: str, datasheet_id: str, gid: Optional[str] = None):
+        self.path: str = path
+        self.datasheet_id: str = datasheet_id
+        self.gid: Optional[str] = gid
+
+    def get_params(self) -> dict[str, str]:
+        params = {"key": self.datasheet_id, "output": "csv"}
+        if self.gid is not None:
+            params["gid"] = self.gid
+        return params
+
+
+class SheetsClient:
+    DEFAULT_BASE_URL = "https://docs.google.com/spreadsheet/ccc"
+
+    def __init__(
+        self,
+        cache_path: str,
+        base_url: Optional[str] = None,
+        timeout: tuple[float, float] = (5, 60),
+        retries: int = 3,
+    ):
+        self.base_url: str = base_url or os.environ.get(
+            "SHEETS_BASE_URL", self.DEFAULT_BASE_URL
+        )
+        self.timeout: tuple[float, float] = timeout
+
+        # Validators and content hash of the last payload of each export, by path
+        self._cache_path = cache_path
+        try:
+            with open(cache_path, "r", encoding="utf8") as f:
+                self._cache: dict[str, dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._cache = {}
+
+        # One pooled session shared by all downloads, retrying transient failures
+        adapter = HTTPAdapter(
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+            ),
+        )
+        self._session = Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def download(self, export: SheetExport) -> bool:
+        """Refresh the export's local CSV, returns whether its content changed."""
+        start = perf_counter()
+        cached = self._cache.get(export.path, {}) if os.path.exists(export.path) else {}
+        headers = {}
+        if "etag" in cached:
+            headers["If-None-Match"] = cached["etag"]
+        if "last_modified" in cached:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        tmp_path = export.path + ".part"
+        with self._session.get(
+            self.base_url,
+            params=export.get_params(),
+            headers=headers,
+            stream=True,
+            timeout=self.timeout,
+        ) as r:
+            r.raise_for_status()
+            if r.status_code == 304:
+                print(f"Not modified {export.path} in {perf_counter() - start:.2f} s")
+                return False
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+            validators = {
+                key: r.headers[header]
+                for key, header in [
+                    ("etag", "ETag"),
+                    ("last_modified", "Last-Modified"),
+                ]
+                if header in r.headers
+            }
+        os.replace(tmp_path, export.path)
+
+        sha256 = file_sha256(export.path)
+        changed = cached.get("sha256") != sha256
+        self._cache[export.path] = {**validators, "sha256": sha256}
+        print(
+            f"Downloaded {export.path} in {perf_counter() - start:.2f} s"
+            + ("" if changed else " (unchanged)")
+        )
+        return changed
+
+    def download_all(self, exports: list[SheetExport]) -> dict[str, bool]:
+        with ThreadPoolExecutor(max_workers=len(exports)) as executor:
+            changed = list(executor.map(self.download, exports))
+        self._save_cache()
+        return {export.path: c for export, c in zip(exports, changed)}
+
+    def close(self):
+        self._session.close()
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+        with open(self._cache_path, "w", encoding="utf8") as f:
+            json.dump(self._cache, f, indent=2)
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Douglas-Peucker tolerance of every simplification level from 1 on, in degrees of
+# latitude, level 0 keeping every vertex
+TOLERANCES = 1e-5 * 2.0 ** np.arange(16)
+# Level of the vertices that are never dropped
+KEEP_LEVEL = np.iinfo(np.uint8).max
+# Zoom levels past the initial one of an interactive map before its geometries get
+# visibly coarse
+ZOOM_IN_LEVELS = 3
+
+
+def get_level(tolerance: float) -> int:
+    """Coarsest level whose tolerance does not exceed the given one."""
+    return int(np.searchsorted(TOLERANCES, tolerance, side="right"))
+
+
+def get_zoom_tolerance(zoom: float, latitude: float) -> float:
+    # Half a 256 pixels web map tile pixel, in degrees of latitude
+    return 360 / (256 * 2**zoom) * np.cos(np.radians(latitude)) / 2
+
+
+def get_chains(
+    sequences: list[np.ndarray], degrees: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct node chains between breaks, as flat nodes and chain start offsets.
+
+    Sequences are the nodes visited by every journey. Journeys are broken at their
+    ends, at turnarounds, and at nodes not linked to exactly two others, so that a
+    chain is the same however many journeys go through it, in either direction.
+    """
+    sequences = [s[np.append(True, s[1:] != s[:-1])] for s in sequences if len(s)]
+    nodes = np.concatenate(sequences)
+    lengths = np.array([len(s) for s in sequences])
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    breaks = degrees[nodes] != 2
+    breaks[starts] = True
+    breaks[ends - 1] = True
+    turnarounds = np.flatnonzero(nodes[:-2] == nodes[2:]) + 1
+    breaks[turnarounds] = True
+    # A node breaking one journey breaks every journey going through it
+    broken = np.zeros(len(degrees), dtype=bool)
+    broken[nodes[breaks]] = True
+    breaks = broken[nodes]
+    breaks[starts] = True
+    breaks[ends - 1] = True
+
+    # Pieces between consecutive breaks of the same journey
+    positions = np.flatnonzero(breaks)
+    journey_ends = np.zeros(len(nodes), dtype=bool)
+    journey_ends[ends - 1] = True
+    piece_starts = positions[:-1][~journey_ends[positions[:-1]]]
+    piece_ends = positions[1:][~journey_ends[positions[:-1]]]
+
+    # Same orientation for a chain whichever way it is travelled, then deduplicate
+    first, last = nodes[piece_starts], nodes[piece_ends]
+    reverse = (first > last) | (
+        (first == last) & (nodes[piece_starts + 1] > nodes[piece_ends - 1])
+    )
+    second = np.where(reverse, nodes[piece_ends - 1], nodes[piece_starts + 1])
+    keys = np.where(reverse, last, first).astype(np.int64) * len(degrees) + second
+    _, distinct = np.unique(keys, return_index=True)
+
+    chains = []
+    for piece in np.sort(distinct):
+        chain = nodes[piece_starts[piece] : piece_ends[piece] + 1]
+        chains.append(chain[::-1] if reverse[piece] else chain)
+    offsets = np.cumsum([0] + [len(chain) for chain in chains])
+    return np.concatenate(chains), offsets[:-1]
+
+
+def get_importance(
+    coordinates: np.ndarray, chain_nodes: np.ndarray, chain_offsets: np.ndarray
+) -> np.ndarray:
+    """Largest Douglas-Peucker tolerance keeping every node, infinite at chain ends.
+
+    Coordinates are lon/lat degrees. Distances are measured with longitudes scaled
+    by the cosine of the latitude, in degrees of latitude. All chains are split one
+    recursion level at a time, every level being a handful of array operations.
+    """
+    latitudes = coordinates[chain_nodes, 1]
+    xy = np.column_stack(
+        (coordinates[chain_nodes, 0] * np.cos(np.radians(latitudes)), latitudes)
+    )
+    importance = np.full(len(xy), np.inf)
+
+    low = chain_offsets
+    high = np.append(chain_offsets[1:], len(xy)) - 1
+    parent = np.full(len(low), np.inf)
+    while True:
+        active = high - low >= 2
+        low, high, parent = low[active], high[active], parent[active]
+        if len(low) == 0:
+            break
+
+        # Distance of every inner point to the segment between the interval ends
+        counts = high - low - 1
+        offsets = np.cumsum(counts) - counts
+        groups = np.repeat(np.arange(len(low)), counts)
+        points = np.arange(counts.sum()) - offsets[groups] + low[groups] + 1
+        distances = _segment_distances(xy[points], xy[low[groups]], xy[high[groups]])
+
+        # Split every interval at its first farthest point
+        maximum = np.maximum.reduceat(distances, offsets)
+        farthest = np.flatnonzero(distances == maximum[groups])
+        _, first = np.unique(groups[farthest], return_index=True)
+        splits = points[farthest[first]]
+        # A point is never worth more than the one that split its interval
+        split_importance = np.minimum(maximum, parent)
+        importance[splits] = split_importance
+
+        low, high = np.concatenate((low, splits)), np.concatenate((splits, high))
+        parent = np.concatenate((split_importance, split_importance))
+
+    nodes_importance = np.full(len(coordinates), np.inf)
+    nodes_importance[chain_nodes] = importance
+    return nodes_importance
+
+
+def get_levels(importance: np.ndarray) -> np.ndarray:
+    # Number of tolerances up to the importance, so the coarsest level keeping it
+    levels = np.searchsorted(TOLERANCES, importance, side="right")
+    levels[np.isinf(importance)] = KEEP_LEVEL
+    return levels.astype(np.uint8)
+
+
+def _segment_distances(points: np.ndarray, a: np.ndarray, b: np.ndarray):
+    ab = b - a
+    ap = points - a
+    length = (ab**2).sum(axis=1)
+    t = np.clip(
+        (ap * ab).sum(axis=1) / np.where(length > 0, length, 1),
+        0,
+        1,
+    )
+    return np.hypot(*(ap - t[:, None] * ab).T)
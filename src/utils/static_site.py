@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:
+    # Brotli siblings are only written when the optional module is installed
+    brotli = None
+
+# Hashed data files never change, pages and tiles may change every day
+DATA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+class StaticPage:
+    """Interactive map page saved with its data in separate content-hashed files.
+
+    Data files are named after their content, so identical data is written once and
+    shared by every page using it, and browsers can cache it for good. Every file is
+    written along with precompressed .gz and .br siblings, and described in the
+    manifest of the plots directory for static hosting. Siblings are not committed
+    with the plots, but written again identically before deploying them.
+    """
+
+    DATA_DIRECTORY = "data"
+    TILES_DIRECTORY = "tiles"
+    MANIFEST = "manifest.json"
+
+    def __init__(self, file_name: str, path: str = "../plots/"):
+        self.file_name: str = file_name
+        self.path: str = path
+        self._data_files: dict[str, dict] = {}
+        self._tiles: list[str] = []
+
+    def add_data(self, name: str, content: str) -> str:
+        """Write a JSON data file and return its URL, relative to the page."""
+        data = content.encode("utf8")
+        digest = hashlib.sha256(data).hexdigest()
+        url = f"{self.DATA_DIRECTORY}/{name}.{digest[:16]}.json"
+        self._data_files[url] = self._write(url, data, "application/json", digest)
+        self._data_files[url]["cache_control"] = DATA_CACHE_CONTROL
+        return url
+
+    def link_data(self, layer, name: str):
+        """Load the data of a folium GeoJson layer from a data file."""
+        layer.embed = False
+        layer.embed_link = self.add_data(name, _compact_json(layer.data))
+
+    def add_tiles(self, name: str) -> str:
+        """URL of a set of vector tiles loaded by the page, relative to the page."""
+        url = f"{self.TILES_DIRECTORY}/{name}/"
+        self._tiles.append(url)
+        return url
+
+    def save(self, m):
+        """Write the page of a folium map, then update the manifest."""
+        url = f"{self.file_name}.html"
+        data = m.get_root().render().encode("utf8")
+        page = self._write(url, data, "text/html", hashlib.sha256(data).hexdigest())
+        page["cache_control"] = PAGE_CACHE_CONTROL
+        page["data"] = sorted(self._data_files)
+        if self._tiles:
+            page["tiles"] = {
+                "paths": self._tiles,
+                "content_type": "application/json",
+                "cache_control": PAGE_CACHE_CONTROL,
+            }
+
+        for file_url, file in [(url, page)] + list(self._data_files.items()):
+            _print_sizes(file_url, file)
+
+        manifest = self._read_manifest()
+        manifest[url] = page
+        manifest.update(self._data_files)
+        self._prune(manifest)
+        with open(os.path.join(self.path, self.MANIFEST), "w") as f:
+            json.dump(dict(sorted(manifest.items())), f, indent=2)
+
+    def _write(self, url: str, data: bytes, content_type: str, digest: str) -> dict:
+        sizes = write_compressed(os.path.join(self.path, url), data)
+        return {
+            "content_type": content_type,
+            "sha256": digest,
+            "size": len(data),
+            "encodings": {
+                encoding: {"path": url + suffix, "size": size}
+                for encoding, (suffix, size) in sizes.items()
+            },
+        }
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.path, self.MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _prune(self, manifest: dict):
+        # Data files no page uses anymore, from previous days
+        used = {url for file in manifest.values() for url in file.get("data", [])}
+        for url in [url for url in manifest if url.startswith(self.DATA_DIRECTORY)]:
+            if url not in used:
+                del manifest[url]
+        directory = os.path.join(self.path, self.DATA_DIRECTORY)
+        for file_name in os.listdir(directory) if os.path.isdir(directory) else []:
+            url = f"{self.DATA_DIRECTORY}/{file_name.split('.json')[0]}.json"
+            if url not in used:
+                os.remove(os.path.join(directory, file_name))
+
+        # Tiles of layers no page loads anymore
+        used = {url for file in manifest.values() for url in _get_tiles(file)}
+        directory = os.path.join(self.path, self.TILES_DIRECTORY)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if f"{self.TILES_DIRECTORY}/{name}/" not in used:
+                shutil.rmtree(os.path.join(directory, name))
+
+
+def compress_site(path: str = "../plots/"):
+    """Write the precompressed siblings of every file of the manifest of a site."""
+    try:
+        with open(os.path.join(path, StaticPage.MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    urls = list(manifest)
+    for tiles_url in {url for file in manifest.values() for url in _get_tiles(file)}:
+        for directory, _, file_names in os.walk(os.path.join(path, tiles_url)):
+            urls += [
+                os.path.relpath(os.path.join(directory, file_name), path)
+                for file_name in file_names
+                if not file_name.endswith((".gz", ".br"))
+            ]
+    for url in urls:
+        with open(os.path.join(path, url), "rb") as f:
+            write_compressed(os.path.join(path, url), f.read())
+    print(f"Compressed {len(urls)} files")
+
+
+def write_compressed(path: str, data: bytes) -> dict[str, tuple[str, int]]:
+    """Write a file with its precompressed siblings, returning their suffix and size."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # mtime set to 0 so that unchanged content compresses to identical files
+    encodings = {"gzip": (".gz", gzip.compress(data, 9, mtime=0))}
+    if brotli is not None:
+        encodings["br"] = (".br", brotli.compress(data))
+    for suffix, content in [("", data)] + list(encodings.values()):
+        with open(path + suffix, "wb") as f:
+            f.write(content)
+    return {
+        encoding: (suffix, len(content))
+        for encoding, (suffix, content) in encodings.items()
+    }
+
+
+def _get_tiles(file: dict) -> list[str]:
+    return file.get("tiles", {}).get("paths", [])
+
+
+def _print_sizes(url: str, file: dict):
+    sizes = [f"{file['size'] / 1e3:.0f} kB"] + [
+        f"{encoded['size'] / 1e3:.0f} kB {encoding}"
+        for encoding, encoded in file["encodings"].items()
+    ]
+    print(f"{url}: {', '.join(sizes)}")
+
+
+def _compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    # Run as a script before deploying, without the plotting dependencies
+    compress_site(*sys.argv[1:])
@@ -0,0 +1,220 @@
+import json
+import os
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .hashing import combine_hashes, file_sha256
+
+_COLUMNS = ["name", "time_zone", "latitude", "longitude"]
+
+
+class Station(NamedTuple):
+    time_zone: str
+    latitude: float
+    longitude: float
+    source: str
+
+
+class CompiledStations:
+    """Standard stations reduced to typed arrays, sorted by UTF-8 encoded name."""
+
+    _ARRAYS = ["names", "time_zone_codes", "latitudes", "longitudes"]
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        time_zone_codes: np.ndarray,
+        time_zones: list[str],
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        sha256: Optional[str] = None,
+    ):
+        self.sha256: Optional[str] = sha256
+        self._names = names
+        self._time_zone_codes = time_zone_codes
+        self._time_zones = time_zones
+        self._latitudes = latitudes
+        self._longitudes = longitudes
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def from_frame(cls, stations: pd.DataFrame) -> "CompiledStations":
+        stations = stations.dropna(subset=["name"]).drop_duplicates(
+            subset="name", keep="first"
+        )
+        names = stations["name"].str.encode("utf8").to_numpy(dtype=bytes)
+        order = np.argsort(names, kind="stable")
+        time_zones = pd.Categorical(stations["time_zone"])
+        return cls(
+            names[order],
+            time_zones.codes.astype(np.int16)[order],
+            time_zones.categories.tolist(),
+            stations["latitude"].to_numpy(dtype=np.float64)[order],
+            stations["longitude"].to_numpy(dtype=np.float64)[order],
+        )
+
+    @classmethod
+    def load_or_compile(cls, csv_path: str, artifact_dir: str) -> "CompiledStations":
+        if cls._is_fresh(csv_path, artifact_dir):
+            return cls.load(artifact_dir)
+
+        stations = cls.from_frame(pd.read_csv(csv_path, sep=";", usecols=_COLUMNS))
+        stations.save(artifact_dir, csv_path)
+        return stations
+
+    @classmethod
+    def load(cls, artifact_dir: str) -> "CompiledStations":
+        with open(os.path.join(artifact_dir, "meta.json"), "r", encoding="utf8") as f:
+            meta = json.load(f)
+        arrays = [
+            np.load(os.path.join(artifact_dir, f"{name}.npy"), mmap_mode="r")
+            for name in cls._ARRAYS
+        ]
+        return cls(
+            arrays[0],
+            arrays[1],
+            meta["time_zones"],
+            arrays[2],
+            arrays[3],
+            sha256=meta["sha256"],
+        )
+
+    def save(self, artifact_dir: str, csv_path: str):
+        os.makedirs(artifact_dir, exist_ok=True)
+        arrays = [self._names, self._time_zone_codes, self._latitudes, self._longitudes]
+        for name, array in zip(self._ARRAYS, arrays):
+            np.save(os.path.join(artifact_dir, f"{name}.npy"), array)
+        meta = {"time_zones": self._time_zones, **_file_signature(csv_path)}
+        self.sha256 = meta["sha256"]
+        with open(os.path.join(artifact_dir, "meta.json"), "w", encoding="utf8") as f:
+            json.dump(meta, f)
+
+    def find(self, station: str) -> Optional[Station]:
+        if not isinstance(station, str):
+            return None
+        key = station.encode("utf8")
+        i = np.searchsorted(self._names, key)
+        if i == len(self._names) or self._names[i] != key:
+            return None
+        code = self._time_zone_codes[i]
+        return Station(
+            self._time_zones[code] if code >= 0 else np.nan,
+            float(self._latitudes[i]),
+            float(self._longitudes[i]),
+            "standard",
+        )
+
+    @staticmethod
+    def _is_fresh(csv_path: str, artifact_dir: str) -> bool:
+        try:
+            with open(
+                os.path.join(artifact_dir, "meta.json"), "r", encoding="utf8"
+            ) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        stat = os.stat(csv_path)
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return True
+
+        # The file was touched: only recompile if its content actually changed
+        signature = _file_signature(csv_path)
+        if meta["sha256"] != signature["sha256"]:
+            return False
+        meta.update(signature)
+        with open(os.path.join(artifact_dir, "meta.json"), "w", encoding="utf8") as f:
+            json.dump(meta, f)
+        return True
+
+
+class StationRegistry:
+    def __init__(
+        self,
+        stations: CompiledStations,
+        custom_stations: pd.DataFrame,
+        custom_sha256: Optional[str] = None,
+    ):
+        self._stations = stations
+        self._custom_sha256 = custom_sha256
+        # Custom stations are indexed first so that they override standard ones,
+        # standard stations are added to the index as they are looked up
+        custom_stations = custom_stations.drop_duplicates(subset="name", keep="first")
+        self._index: dict[str, Station] = {
+            name: Station(time_zone, latitude, longitude, "custom")
+            for name, time_zone, latitude, longitude in zip(
+                custom_stations["name"],
+                custom_stations["time_zone"],
+                custom_stations["latitude"],
+                custom_stations["longitude"],
+            )
+        }
+
+    @classmethod
+    def from_csv(
+        cls, stations_path: str, custom_stations_path: str, artifact_dir: str
+    ) -> "StationRegistry":
+        return cls(
+            CompiledStations.load_or_compile(stations_path, artifact_dir),
+            pd.read_csv(custom_stations_path, sep=",", usecols=_COLUMNS),
+            custom_sha256=file_sha256(custom_stations_path),
+        )
+
+    def get_signature(self) -> str:
+        # Identifies the station data, for caches of anything derived from it
+        return combine_hashes(str(self._stations.sha256), str(self._custom_sha256))
+
+    def get_time_zones(self, stations: pd.Series) -> pd.Series:
+        records = self._lookup(stations.unique(), ["time_zone"])
+        return stations.map(
+            {name: record.time_zone for name, record in records.items()}
+        )
+
+    def get_all_coordinates(self, stations: pd.Series) -> pd.DataFrame:
+        records = self._lookup(stations.unique(), ["latitude", "longitude"])
+        return pd.DataFrame(
+            {
+                "latitude": stations.map(
+                    {name: record.latitude for name, record in records.items()}
+                ),
+                "longitude": stations.map(
+                    {name: record.longitude for name, record in records.items()}
+                ),
+            }
+        )
+
+    def _find(self, station: str) -> Optional[Station]:
+        record = self._index.get(station)
+        if record is None:
+            record = self._stations.find(station)
+            if record is not None:
+                self._index[station] = record
+        return record
+
+    def _lookup(self, stations: Iterable[str], fields: list[str]) -> dict[str, Station]:
+        records = {}
+        unknown = []
+        for station in stations:
+            record = self._find(station)
+            if record is None or any(pd.isna(getattr(record, f)) for f in fields):
+                unknown.append(station)
+            else:
+                records[station] = record
+        if unknown:
+            raise ValueError(
+                f"Could not find station names {', '.join(f'[{s}]' for s in unknown)} "
+                "in either standard or custom station CSVs."
+            )
+        return records
+
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": file_sha256(path),
+    }
@@ -0,0 +1,136 @@
+import os
+import time
+from typing import Optional
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .hashing import combine_hashes
+
+# Slippy map tile, as (x, y, z) like cartopy's tile factories
+Tile = tuple[int, int, int]
+
+
+class HttpTileSource:
+    """Tiles fetched from a URL template with {x}, {y} and {z} placeholders."""
+
+    def __init__(self, url_template: str, timeout=(5, 30), retries: int = 3):
+        self.url_template: str = url_template
+        self.timeout: tuple[float, float] = timeout
+
+        # One pooled session shared by all fetching threads
+        adapter = HTTPAdapter(
+            pool_maxsize=TileCache.MAX_THREADS,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+            ),
+        )
+        self._session = Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def get_key(self) -> str:
+        # Without the query string, so that a new access token keeps the cache
+        return combine_hashes(self.url_template.split("?")[0])[:16]
+
+    def fetch(self, tile: Tile) -> bytes:
+        x, y, z = tile
+        response = self._session.get(
+            self.url_template.format(x=x, y=y, z=z), timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise OSError(f"Tile {z}/{x}/{y}: HTTP {response.status_code}")
+        return response.content
+
+
+class DirectoryTileSource:
+    """Tiles read from a local z/x/y.png directory tree."""
+
+    def __init__(self, path: str):
+        self.path: str = path
+
+    def get_key(self) -> str:
+        return combine_hashes(os.path.abspath(self.path))[:16]
+
+    def fetch(self, tile: Tile) -> bytes:
+        x, y, z = tile
+        with open(os.path.join(self.path, str(z), str(x), f"{y}.png"), "rb") as f:
+            return f.read()
+
+
+class TileCache:
+    """Tiles of one source stored as z/x/y.png files, expiring after a time to live.
+
+    Files derived from the tiles can be kept along with them. Files keep their
+    download time as modification time and their last use as access time, the least
+    recently used ones being evicted past a total size.
+    """
+
+    MAX_THREADS = 16
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path: str = path
+        self.ttl_seconds: float = ttl_seconds
+        self.max_bytes: int = max_bytes
+
+    def get(self, tile: Tile) -> Optional[bytes]:
+        return self.read(self._get_name(tile))
+
+    def put(self, tile: Tile, data: bytes):
+        self.write(self._get_name(tile), data)
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Content of a cached file, None when it is missing or expired."""
+        path = os.path.join(self.path, name)
+        try:
+            modified = os.path.getmtime(path)
+            if time.time() - modified > self.ttl_seconds:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path, (time.time(), modified))
+        return data
+
+    def write(self, name: str, data: bytes):
+        path = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Renamed into place, so that concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """Delete expired tiles, then least recently used ones past the size limit."""
+        entries = []
+        now = time.time()
+        evicted = 0
+        for directory, _, files in os.walk(self.path):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.ttl_seconds:
+                    os.remove(path)
+                    evicted += 1
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            os.remove(path)
+            size -= file_size
+            evicted += 1
+        return evicted
+
+    @staticmethod
+    def _get_name(tile: Tile) -> str:
+        x, y, z = tile
+        return os.path.join(str(z), str(x), f"{y}.png")
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+import shapely
+from branca.element import MacroElement
+from jinja2 import Template
+
+from .hashing import combine_hashes
+from .polyline import DECODE_FEATURES_JS, encode_features, get_precision
+from .simplify import get_level, get_zoom_tolerance
+from .static_site import write_compressed
+from .tiles import Tile
+
+# Margin around every tile, as a fraction of its size, so that lines cut at tile
+# edges join without gaps
+TILE_MARGIN = 4 / 256
+
+
+class VectorTiler:
+    """Line features cut into z/x/y tiles of encoded polylines, simplified per zoom.
+
+    Every tile is simplified and rounded within half a pixel at its zoom level and
+    latitude. Tiles are only recomputed when the features around them changed, as
+    recorded by the hash of their inputs in an index next to the tiles.
+    """
+
+    INDEX = "index.json"
+    MAX_THREADS = 8
+
+    def __init__(self, path: str, min_zoom: int, max_zoom: int):
+        self.path: str = path
+        self.min_zoom: int = min_zoom
+        self.max_zoom: int = max_zoom
+
+    def write(self, get_features: Callable[[int], list[tuple[dict, np.ndarray]]]):
+        """Write the tiles of the features at every simplification level they need.
+
+        Features are given as (properties, lon/lat coordinates) couples, for every
+        simplification level, in drawing order.
+        """
+        start = perf_counter()
+        os.makedirs(self.path, exist_ok=True)
+        index = self._read_index()
+        layers = {}
+        tiles = {}
+        for zoom in range(self.min_zoom, self.max_zoom + 1):
+            for y in range(2**zoom):
+                tolerance = get_zoom_tolerance(zoom, _tile_latitude(zoom, y + 0.5))
+                level = get_level(tolerance)
+                if level not in layers:
+                    layers[level] = _FeatureLayer(get_features(level))
+                for x, candidates in layers[level].get_row_candidates(zoom, y).items():
+                    tiles[(x, y, zoom)] = (
+                        layers[level],
+                        candidates,
+                        get_precision(tolerance),
+                    )
+
+        # Tiles whose features, level and precision did not change are kept as is
+        keys = {}
+        outdated = []
+        for tile, (layer, candidates, precision) in tiles.items():
+            keys[tile] = combine_hashes(
+                str(precision), *(layer.hashes[i] for i in candidates)
+            )
+            if index.get(_get_name(tile)) != keys[tile]:
+                outdated.append(tile)
+        with ThreadPoolExecutor(max_workers=self.MAX_THREADS) as executor:
+            written = sum(
+                executor.map(
+                    lambda tile: self._write_tile(tile, *tiles[tile]), outdated
+                )
+            )
+
+        # Tiles of these zoom levels no feature reaches anymore
+        removed = 0
+        for name in list(index):
+            tile = _get_tile(name)
+            if self.min_zoom <= tile[2] <= self.max_zoom and tile not in tiles:
+                self._remove_tile(tile)
+                del index[name]
+                removed += 1
+        index.update({_get_name(tile): key for tile, key in keys.items()})
+        with open(os.path.join(self.path, self.INDEX), "w") as f:
+            json.dump(index, f)
+
+        print(
+            f"Vector tiles {self.path}: {len(tiles)} tiles, {len(outdated)} updated "
+            f"({written} with features), {removed} removed in "
+            f"{perf_counter() - start:.1f} s"
+        )
+
+    def _write_tile(
+        self, tile: Tile, layer: "_FeatureLayer", candidates: list, precision: int
+    ) -> bool:
+        x, y, zoom = tile
+        clipped = shapely.clip_by_rect(
+            layer.lines[candidates],
+            _tile_longitude(zoom, x - TILE_MARGIN),
+            _tile_latitude(zoom, y + 1 + TILE_MARGIN),
+            _tile_longitude(zoom, x + 1 + TILE_MARGIN),
+            _tile_latitude(zoom, y - TILE_MARGIN),
+        )
+        parts, indices = shapely.get_parts(clipped, return_index=True)
+        features = [
+            (layer.properties[candidates[i]], shapely.get_coordinates(part))
+            for part, i in zip(parts, indices)
+            if not part.is_empty
+        ]
+
+        # Tiles without features are not written, the browser skipping missing ones
+        if not features:
+            self._remove_tile(tile)
+            return False
+        data = encode_features(features, precision).encode("utf8")
+        write_compressed(os.path.join(self.path, _get_name(tile)), data)
+        return True
+
+    def _remove_tile(self, tile: Tile):
+        path = os.path.join(self.path, _get_name(tile))
+        for suffix in ["", ".gz", ".br"]:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def _read_index(self) -> dict[str, str]:
+        try:
+            with open(os.path.join(self.path, self.INDEX)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+class _FeatureLayer:
+    # Features of one simplification level, with their bounds and content hashes
+    def __init__(self, features: list[tuple[dict, np.ndarray]]):
+        self.properties: list[dict] = [properties for properties, _ in features]
+        lengths = [len(coordinates) for _, coordinates in features]
+        self.lines: np.ndarray = shapely.linestrings(
+            np.concatenate(
+                [np.empty((0, 2))] + [coordinates for _, coordinates in features]
+            ),
+            indices=np.repeat(np.arange(len(features)), lengths),
+        )
+        self.bounds: np.ndarray = shapely.bounds(self.lines)
+        self.hashes: list[str] = [
+            combine_hashes(
+                json.dumps(properties, sort_keys=True),
+                hashlib.sha256(np.ascontiguousarray(coordinates)).hexdigest(),
+            )
+            for properties, coordinates in features
+        ]
+
+    def get_row_candidates(self, zoom: int, y: int) -> dict[int, list[int]]:
+        """Features whose bounds reach the tiles of a row, by tile column."""
+        lat_min = _tile_latitude(zoom, y + 1 + TILE_MARGIN)
+        lat_max = _tile_latitude(zoom, y - TILE_MARGIN)
+        in_row = np.flatnonzero(
+            (self.bounds[:, 1] <= lat_max) & (self.bounds[:, 3] >= lat_min)
+        )
+
+        # Columns spanned by the bounds of every feature, margins included
+        n = 2**zoom
+        x_min = np.floor((self.bounds[in_row, 0] + 180) / 360 * n - TILE_MARGIN)
+        x_max = np.floor((self.bounds[in_row, 2] + 180) / 360 * n + TILE_MARGIN)
+        candidates = {}
+        for i, first, last in zip(in_row, x_min.astype(int), x_max.astype(int)):
+            for x in range(max(first, 0), min(last, n - 1) + 1):
+                candidates.setdefault(x, []).append(i)
+        return candidates
+
+
+class VectorTileLoader(MacroElement):
+    """Tiles of a VectorTiler loaded into a folium GeoJson layer as the map moves.
+
+    Only the tiles in view are loaded, at the map zoom level clamped to the zoom
+    levels of the tiles. Tiles of another zoom level are dropped on zooming.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function () {"""
+        + DECODE_FEATURES_JS
+        + """
+            var map = {{ this._parent.get_name() }};
+            var layer = {{ this.layer.get_name() }};
+            var loaded = {}, zoom = null;
+            function update() {
+                var z = Math.max(
+                    {{ this.min_zoom }},
+                    Math.min({{ this.max_zoom }}, Math.round(map.getZoom()))
+                );
+                if (z !== zoom) {
+                    layer.clearLayers();
+                    loaded = {};
+                    zoom = z;
+                }
+                var bounds = map.getPixelBounds();
+                var scale = Math.pow(2, z - map.getZoom()) / 256;
+                var n = Math.pow(2, z);
+                var xMin = Math.max(0, Math.floor(bounds.min.x * scale));
+                var xMax = Math.min(n - 1, Math.floor(bounds.max.x * scale));
+                var yMin = Math.max(0, Math.floor(bounds.min.y * scale));
+                var yMax = Math.min(n - 1, Math.floor(bounds.max.y * scale));
+                for (var x = xMin; x <= xMax; x++) {
+                    for (var y = yMin; y <= yMax; y++) {
+                        var name = z + "/" + x + "/" + y;
+                        if (loaded[name]) {
+                            continue;
+                        }
+                        loaded[name] = true;
+                        fetch({{ this.url|tojson }} + name + ".json")
+                            .then(function (response) {
+                                return response.ok ? response.json() : null;
+                            })
+                            .then(function (z, data) {
+                                if (data && z === zoom) {
+                                    layer.addData(decodeFeatures(data));
+                                }
+                            }.bind(null, z));
+                    }
+                }
+            }
+            map.on("moveend", update);
+            update();
+        })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, layer, url: str, min_zoom: int, max_zoom: int):
+        super().__init__()
+        self._name = "VectorTileLoader"
+        self.layer = layer
+        self.url: str = url
+        self.min_zoom: int = min_zoom
+        self.max_zoom: int = max_zoom
+
+
+def _get_name(tile: Tile) -> str:
+    x, y, zoom = tile
+    return f"{zoom}/{x}/{y}.json"
+
+
+def _get_tile(name: str) -> Tile:
+    zoom, x, y = name[: -len(".json")].split("/")
+    return int(x), int(y), int(zoom)
+
+
+def _tile_longitude(zoom: int, x: float) -> float:
+    return x / 2**zoom * 360 - 180
+
+
+def _tile_latitude(zoom: int, y: float) -> float:
+    # Web Mercator tile row to latitude, rows going south from the top of the map
+    return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / 2**zoom)))))